@@ -6,24 +6,67 @@ multiple structured diagnostic ideas from user issues, with sophisticated
 JSON parsing strategies and deterministic ranking.
 """
 
+import itertools
 import json
-import uuid
 import os
+import secrets
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
 
 from .system_diagnostics import SystemDiagnostics
 from .llm_interface import LLMInterface
+from . import json_utils
+from .response_cache import TTLCache
+
+# Prompt templates resolved from disk, keyed by (kind, category_hint, RN_PROMPT_DIR)
+_template_cache = TTLCache(maxsize=64, ttl=float(os.getenv('RN_PROMPT_CACHE_TTL', '2')))
+
+# Response parsing patterns: ```json fenced blocks and "1. {...}" numbered items
+_FENCE_RE = re.compile(r"```(?:json)?\n(.*?)```", re.DOTALL | re.IGNORECASE)
+_NUMBERED_RE = re.compile(r'^\d+\.\s*(\{.*?\})', re.MULTILINE | re.DOTALL)
+
+# Template syntax: {{#KEY}}...{{/KEY}} optional blocks and {{KEY}} placeholders
+_TEMPLATE_BLOCK_RE = re.compile(r'\{\{#(\w+)\}\}(.*?)\{\{/\1\}\}', re.DOTALL)
+_TEMPLATE_VAR_RE = re.compile(r'\{\{(\w+)\}\}')
+
+# Decoder for pulling JSON objects out of free text (raw_decode reports where each ends)
+_JSON_DECODER = json.JSONDecoder()
+
+# Sampling temperature per creativity level (0-3); unknown levels use 0.3
+_TEMPERATURE_MAP = {0: 0.0, 1: 0.3, 2: 0.7, 3: 1.0}
+
+# Judge safety score per declared risk
+_RISK_MAP = {'low': 0.9, 'medium': 0.6, 'high': 0.2}
+
+# Judge keyword matchers, compiled once instead of re-scanning per idea
+_ISSUE_CATEGORY_RE = {
+    'wifi': re.compile(r'wifi|wireless', re.IGNORECASE),
+    'dns': re.compile(r'dns|resolution', re.IGNORECASE),
+    'network': re.compile(r'network|interface', re.IGNORECASE),
+}
+_CHECK_TOOL_RE = re.compile(r'nmcli|systemctl', re.IGNORECASE)
+_CHECK_TOOL_BOOST = {'nmcli': 0.3, 'systemctl': 0.2}
+_REBOOT_RE = re.compile(r'reboot', re.IGNORECASE)
+_REINSTALL_RE = re.compile(r'reinstall', re.IGNORECASE)
+
+# Idea ids: random per-process prefix + counter (8 hex chars, longer after 65,536 ideas so they
+# never repeat within a process; no urandom read per idea)
+_ID_PREFIX = secrets.token_hex(2)
+_ID_COUNTER = itertools.count()
 
 
 class Idea:
     """Structured representation of a diagnostic/fix idea."""
+    __slots__ = ('id', 'hypothesis', 'category', 'why', 'checks', 'fixes',
+                 'risk', 'confidence', 'evidence')
+
     def __init__(self, hypothesis: str, category: str, why: str, 
                  checks: List[str] = None, fixes: List[str] = None, 
                  risk: str = "low", confidence: float = 0.5):
-        self.id = str(uuid.uuid4())[:8]
+        self.id = f"{_ID_PREFIX}{next(_ID_COUNTER):04x}"
         self.hypothesis = hypothesis
         self.category = category  # wifi, dns, network, performance, etc.
         self.why = why
@@ -32,6 +75,21 @@ class Idea:
         self.risk = risk  # low, medium, high
         self.confidence = confidence
         self.evidence = {}  # Will hold probe results
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Idea':
+        """Rebuild an idea sent back by a client, keeping its id (new one only if missing)."""
+        idea = cls.__new__(cls)
+        idea.id = data.get('id') or secrets.token_hex(4)
+        idea.hypothesis = data.get('hypothesis', '')
+        idea.category = data.get('category', 'general')
+        idea.why = data.get('why', '')
+        idea.checks = data.get('checks', [])
+        idea.fixes = data.get('fixes', [])
+        idea.risk = data.get('risk', 'medium')
+        idea.confidence = 0.5
+        idea.evidence = {}
+        return idea
     
     def to_dict(self) -> Dict:
         return {
@@ -54,6 +112,18 @@ class TemplateLoader:
     def load_template(kind: str, category_hint: Optional[str] = None) -> str:
         """Load template with category-specific fallback."""
         base_dir = os.getenv('RN_PROMPT_DIR')
+        # Resolved bodies are reused for RN_PROMPT_CACHE_TTL seconds (default 2), so edits
+        # and new category files still hot-reload without a stat + read per request
+        key = _template_cache.make_key(kind, category_hint, base_dir)
+        body = _template_cache.get(key)
+        if body is None:
+            body = TemplateLoader._read_template(kind, category_hint, base_dir)
+            _template_cache.set(key, body)
+        return body
+
+    @staticmethod
+    def _read_template(kind: str, category_hint: Optional[str], base_dir: Optional[str]) -> str:
+        """Find and read the template on disk (category file, then base, then built-in)."""
         search_dirs = []
         if base_dir:
             search_dirs.append(Path(base_dir))
@@ -78,29 +148,15 @@ class TemplateLoader:
     @staticmethod
     def render_template(tpl: str, ctx: Dict[str, str]) -> str:
         """Render template with mustache-like conditional blocks and replacements."""
-        def toggle_block(text: str, key: str, value: str) -> str:
-            start = f"{{{{#{key}}}}}"
-            end = f"{{{{/{key}}}}}"
-            while True:
-                i = text.find(start)
-                if i == -1:
-                    break
-                j = text.find(end, i)
-                if j == -1:
-                    break
-                inner = text[i + len(start): j]
-                replacement = inner if value else ''
-                text = text[:i] + replacement + text[j + len(end):]
-            return text
-
-        out = tpl
-        # Optional blocks
-        out = toggle_block(out, 'CATEGORY_HINT', ctx.get('CATEGORY_HINT') or '')
-        out = toggle_block(out, 'RETRIEVAL', ctx.get('RETRIEVAL') or '')
-        # Simple replacements
-        for k, v in ctx.items():
-            out = out.replace(f"{{{{{k}}}}}", v or '')
-        return out
+        # {{#KEY}} blocks are kept only when ctx[KEY] is set (nested blocks included)
+        def toggle_block(m: re.Match) -> str:
+            if not ctx.get(m.group(1)):
+                return ''
+            return _TEMPLATE_BLOCK_RE.sub(toggle_block, m.group(2))
+
+        out = _TEMPLATE_BLOCK_RE.sub(toggle_block, tpl)
+        # Simple replacements in one pass, so substituted text is never re-expanded
+        return _TEMPLATE_VAR_RE.sub(lambda m: (ctx[m.group(1)] or '') if m.group(1) in ctx else m.group(0), out)
 
 
 class BrainstormEngine:
@@ -115,34 +171,139 @@ class BrainstormEngine:
         """Generate N ideas with specified creativity level (0-3)."""
         
         # Adjust LLM parameters based on creativity
-        temperature_map = {0: 0.0, 1: 0.3, 2: 0.7, 3: 1.0}
-        temperature = temperature_map.get(creativity, 0.3)
+        temperature = self.temperature_for(creativity)
+        tpl, ctx = self._prompt_template(issue, category_hint, retrieval_text)
+
+        # Large brainstorms can be split into concurrent sub-prompts of RN_BRAINSTORM_SPLIT ideas
+        # each. Only worth it when Ollama decodes in parallel (OLLAMA_NUM_PARALLEL > 1);
+        # otherwise the requests just queue, so the default (0) keeps a single prompt.
+        split = int(os.getenv('RN_BRAINSTORM_SPLIT', '0'))
+        sizes = [n] if split <= 0 or n <= split else [min(split, n - i) for i in range(0, n, split)]
+
+        # Stream the generation and stop once `size` ideas parse (RN_STREAM_EARLY_STOP=0 disables)
+        early_stop = os.getenv('RN_STREAM_EARLY_STOP', '1').lower() in ('1', 'true', 'yes', 'on')
+
+        def ask(size: int) -> List[Idea]:
+            prompt = TemplateLoader.render_template(tpl, {**ctx, 'N': str(size)})
+            # Get LLM response with per-request creativity
+            # Each JSON idea ~100-200 tokens, so scale appropriately
+            num_predict = max(512, size * 120)  # At least 120 tokens per idea
+            llm_response = self.llm_interface.get_response(
+                prompt,
+                temperature=temperature,
+                num_predict=num_predict,
+                stop=(lambda text: self._has_ideas(text, size)) if early_stop else None,
+            )
+            return self._parse_ideas_response(llm_response, issue)
+
+        if len(sizes) == 1:
+            ideas = ask(n)
+        else:
+            with ThreadPoolExecutor(max_workers=len(sizes)) as pool:
+                batches = list(pool.map(ask, sizes))
+            ideas = self._merge_idea_batches(batches)
         
-        # Build brainstorming prompt (template, optional category hint)
+        return ideas[:n]  # Ensure we return exactly n ideas
+    
+    def iter_ideas(self, issue: str, n: int = 5, creativity: int = 1,
+                   category_hint: Optional[str] = None, retrieval_text: str = "") -> Iterator[Idea]:
+        """Yield up to N ideas one by one as the model finishes writing each of them."""
+        tpl, ctx = self._prompt_template(issue, category_hint, retrieval_text)
+        prompt = TemplateLoader.render_template(tpl, {**ctx, 'N': str(n)})
+        chunks = self.llm_interface.stream_response(
+            prompt, temperature=self.temperature_for(creativity), num_predict=max(512, n * 120))
+        text, pos, count = '', 0, 0
+        try:
+            for chunk in chunks:
+                text += chunk
+                if '}' not in chunk:
+                    continue
+                ideas, pos = self._complete_ideas(text, pos)
+                for idea in ideas[:n - count]:
+                    count += 1
+                    yield idea
+                if count >= n:
+                    return  # closing the stream stops generation
+        finally:
+            chunks.close()
+        if not count:
+            # Nothing streamed as separate objects (e.g. {"ideas": [...]}); parse the whole reply
+            yield from self._parse_ideas_response(text, issue)[:n]
+
+    @staticmethod
+    def _complete_ideas(text: str, pos: int) -> Tuple[List[Idea], int]:
+        """Ideas whose JSON object is complete in text[pos:], and where the next scan starts.
+
+        Every '{' is tried, so ideas nested in a still-open wrapper object are found too;
+        only objects with a hypothesis count, and pos only moves past emitted ones.
+        """
+        ideas: List[Idea] = []
+        start = text.find('{', pos)
+        while start != -1:
+            try:
+                obj, end = _JSON_DECODER.raw_decode(text, start)
+            except ValueError:
+                start = text.find('{', start + 1)
+                continue
+            if isinstance(obj, dict) and 'hypothesis' in obj:
+                ideas.append(Idea(
+                    hypothesis=obj['hypothesis'],
+                    category=obj.get('category', 'general'),
+                    why=obj.get('why', 'No reasoning provided'),
+                    checks=obj.get('checks', []),
+                    fixes=obj.get('fixes', []),
+                    risk=obj.get('risk', 'medium')
+                ))
+                pos = end
+                start = text.find('{', end)
+            else:
+                start = text.find('{', start + 1)
+        return ideas, pos
+
+    @staticmethod
+    def _prompt_template(issue: str, category_hint: Optional[str], retrieval_text: str) -> Tuple[str, Dict]:
+        """Brainstorm template and its context; the caller fills in N."""
         system_info = SystemDiagnostics.get_system_info()
-        connectivity = SystemDiagnostics.check_connectivity()
+        connectivity = SystemDiagnostics.connectivity_for(issue)
         tpl = TemplateLoader.load_template('brainstorm', category_hint=category_hint)
         ctx = {
-            'SYSTEM': json.dumps(system_info, ensure_ascii=False),
-            'CONNECTIVITY': json.dumps(connectivity, ensure_ascii=False),
+            'SYSTEM': json_utils.dumps(system_info),
+            'CONNECTIVITY': json_utils.dumps(connectivity),
             'ISSUE': issue,
             'CATEGORY_HINT': category_hint or '',
-            'N': str(n),
             'RETRIEVAL': retrieval_text or '',
         }
-        prompt = TemplateLoader.render_template(tpl, ctx)
-
-        # Get LLM response with per-request creativity
-        # Each JSON idea ~100-200 tokens, so scale appropriately
-        num_predict = max(512, n * 120)  # At least 120 tokens per idea
-        llm_response = self.llm_interface.get_response(
-            prompt,
-            temperature=temperature,
-            num_predict=num_predict,
-        )
-        ideas = self._parse_ideas_response(llm_response, issue)
-        
-        return ideas[:n]  # Ensure we return exactly n ideas
+        return tpl, ctx
+
+    @staticmethod
+    def _has_ideas(text: str, n: int) -> bool:
+        """Whether partial model output already holds n complete idea objects."""
+        # Only re-parse when an object or array may just have closed
+        if not text.rstrip().endswith(('}', ']')):
+            return False
+        return len(BrainstormEngine._complete_ideas(text, 0)[0]) >= n
+
+    @staticmethod
+    def _merge_idea_batches(batches: List[List[Idea]]) -> List[Idea]:
+        """Concatenate sub-prompt results, dropping repeated hypotheses and parse fallbacks."""
+        merged: List[Idea] = []
+        seen: Set[str] = set()
+        fallback = None
+        for batch in batches:
+            for idea in batch:
+                if idea.hypothesis == "Generic troubleshooting approach":
+                    fallback = fallback or idea
+                    continue
+                key = idea.hypothesis.strip().lower()
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(idea)
+        return merged or [fallback]
+
+    @staticmethod
+    def temperature_for(creativity: int) -> float:
+        """Sampling temperature for a creativity level (0-3)."""
+        return _TEMPERATURE_MAP.get(creativity, 0.3)
     
     @staticmethod
     def _parse_ideas_response(response: str, issue: str) -> List[Idea]:
@@ -163,7 +324,7 @@ class BrainstormEngine:
 
         # 1) Direct JSON parse (array or object)
         try:
-            data = json.loads(text)
+            data = json_utils.loads(text)
             if isinstance(data, list):
                 for item in data:
                     if isinstance(item, dict):
@@ -181,11 +342,10 @@ class BrainstormEngine:
 
         # 2) Parse fenced code blocks ```json ... ```
         if not ideas:
-            fence_pattern = re.compile(r"```(?:json)?\n(.*?)```", re.DOTALL | re.IGNORECASE)
-            for block in fence_pattern.findall(text):
+            for block in _FENCE_RE.findall(text):
                 block = block.strip()
                 try:
-                    blk = json.loads(block)
+                    blk = json_utils.loads(block)
                     if isinstance(blk, list):
                         for item in blk:
                             if isinstance(item, dict):
@@ -203,35 +363,27 @@ class BrainstormEngine:
         # 3) Parse numbered JSON list format (1. {...}, 2. {...})
         if not ideas:
             # Match numbered items with JSON objects
-            numbered_pattern = re.compile(r'^\d+\.\s*(\{.*?\})', re.MULTILINE | re.DOTALL)
-            for match in numbered_pattern.findall(text):
+            for match in _NUMBERED_RE.findall(text):
                 try:
-                    obj = json.loads(match)
+                    obj = json_utils.loads(match)
                     if isinstance(obj, dict):
                         ideas.append(to_idea(obj))
                 except Exception:
                     continue
 
-        # 4) Curly-brace balanced objects found in text
+        # 4) JSON objects embedded in prose: decode each from its opening brace and resume
+        #    after it (the C decoder handles nesting and braces inside strings)
         if not ideas:
-            buf = []
-            depth = 0
-            for ch in text:
-                if ch == '{':
-                    depth += 1
-                if depth > 0:
-                    buf.append(ch)
-                if ch == '}':
-                    depth -= 1
-                    if depth == 0 and buf:
-                        candidate = ''.join(buf)
-                        buf = []
-                        try:
-                            obj = json.loads(candidate)
-                            if isinstance(obj, dict):
-                                ideas.append(to_idea(obj))
-                        except Exception:
-                            continue
+            pos = text.find('{')
+            while pos != -1:
+                try:
+                    obj, end = _JSON_DECODER.raw_decode(text, pos)
+                except ValueError:
+                    pos = text.find('{', pos + 1)
+                    continue
+                if isinstance(obj, dict):
+                    ideas.append(to_idea(obj))
+                pos = text.find('{', end)
 
         # 5) Fallback
         if not ideas:
@@ -256,9 +408,12 @@ class JudgeEngine:
         
         scored_ideas = []
         system_info = SystemDiagnostics.get_system_info()
+        issue_categories = JudgeEngine._issue_categories(issue)
+        ubuntu = JudgeEngine._is_ubuntu(system_info)
         
         for idea in ideas:
-            scores = JudgeEngine._score_idea(idea, issue, system_info)
+            scores = JudgeEngine._score_idea(idea, issue, system_info,
+                                             issue_categories=issue_categories, ubuntu=ubuntu)
             
             # Calculate weighted total score
             total_score = (
@@ -281,39 +436,51 @@ class JudgeEngine:
         return scored_ideas
     
     @staticmethod
-    def _score_idea(idea: Idea, issue: str, system_info: Dict) -> Dict:
+    def _issue_categories(issue: str) -> Set[str]:
+        """Categories whose keywords appear in the issue text."""
+        return {cat for cat, rx in _ISSUE_CATEGORY_RE.items() if rx.search(issue)}
+
+    @staticmethod
+    def _is_ubuntu(system_info: Dict) -> bool:
+        return 'ubuntu' in system_info.get('distro', '').lower()
+
+    @staticmethod
+    def _score_idea(idea: Idea, issue: str, system_info: Dict,
+                    issue_categories: Optional[Set[str]] = None,
+                    ubuntu: Optional[bool] = None) -> Dict:
         """Score an idea across multiple criteria (0.0 - 1.0)."""
         scores = {}
+        if issue_categories is None:
+            issue_categories = JudgeEngine._issue_categories(issue)
+        if ubuntu is None:
+            ubuntu = JudgeEngine._is_ubuntu(system_info)
         
         # Safety score (higher = safer)
-        risk_map = {'low': 0.9, 'medium': 0.6, 'high': 0.2}
-        scores['safety'] = risk_map.get(idea.risk, 0.5)
+        scores['safety'] = _RISK_MAP.get(idea.risk, 0.5)
         
         # Success likelihood (higher = more likely to work)
         likelihood = 0.5  # Default
         
         # Boost score for OS-appropriate suggestions
-        if 'ubuntu' in system_info.get('distro', '').lower():
-            if any('nmcli' in check.lower() for check in idea.checks):
-                likelihood += 0.3
-            if any('systemctl' in check.lower() for check in idea.checks):
-                likelihood += 0.2
+        if ubuntu:
+            tools = {t.lower() for t in _CHECK_TOOL_RE.findall('\n'.join(idea.checks))}
+            for tool, boost in _CHECK_TOOL_BOOST.items():
+                if tool in tools:
+                    likelihood += boost
         
         # Boost for category match
-        issue_lower = issue.lower()
-        if (idea.category == 'wifi' and any(w in issue_lower for w in ['wifi', 'wireless'])) or \
-           (idea.category == 'dns' and any(w in issue_lower for w in ['dns', 'resolution'])) or \
-           (idea.category == 'network' and any(w in issue_lower for w in ['network', 'interface'])):
+        if idea.category in issue_categories:
             likelihood += 0.2
             
         scores['success_likelihood'] = min(likelihood, 1.0)
         
         # Cost score (higher = cheaper/faster)
         cost = 0.8  # Default: most commands are cheap
-        if any('reboot' in fix.lower() for fix in idea.fixes):
-            cost = 0.3  # Reboots are expensive
-        if any('reinstall' in fix.lower() for fix in idea.fixes):
+        fixes_text = '\n'.join(idea.fixes)
+        if _REINSTALL_RE.search(fixes_text):
             cost = 0.1  # Reinstalls are very expensive
+        elif _REBOOT_RE.search(fixes_text):
+            cost = 0.3  # Reboots are expensive
             
         scores['cost'] = cost
         
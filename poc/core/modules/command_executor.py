@@ -5,9 +5,15 @@ Provides safe command execution with risk analysis and safety checks.
 Extracted from roadnerd_server.py for modular architecture.
 """
 
+import re
 import subprocess
 from typing import Dict
 
+# Substrings that mark a command as high risk, matched case-insensitively in one pass
+# (a lookahead, so overlapping hits such as 'rm -rformat' still report every pattern)
+_DANGEROUS_PATTERNS = ('rm -rf', 'dd if=', 'mkfs', '> /dev/', 'format')
+_DANGEROUS_RE = re.compile('(?=(' + '|'.join(map(re.escape, _DANGEROUS_PATTERNS)) + '))', re.IGNORECASE)
+
 
 class CommandExecutor:
     """Safely execute system commands"""
@@ -15,17 +21,17 @@ class CommandExecutor:
     @staticmethod
     def analyze_command(cmd: str) -> Dict:
         """Analyze a command for safety"""
-        dangerous_patterns = ['rm -rf', 'dd if=', 'mkfs', '> /dev/', 'format']
-        
         risk_level = 'low'
         warnings = []
         
-        for pattern in dangerous_patterns:
-            if pattern in cmd.lower():
+        found = {m.group(1).lower() for m in _DANGEROUS_RE.finditer(cmd)}
+        for pattern in _DANGEROUS_PATTERNS:
+            if pattern in found:
                 risk_level = 'high'
                 warnings.append(f"Contains dangerous pattern: {pattern}")
         
-        if 'sudo' in cmd:
+        requires_sudo = 'sudo' in cmd
+        if requires_sudo:
             risk_level = 'medium' if risk_level == 'low' else 'high'
             warnings.append("Requires elevated privileges")
         
@@ -33,7 +39,7 @@ class CommandExecutor:
             'command': cmd,
             'risk_level': risk_level,
             'warnings': warnings,
-            'requires_sudo': 'sudo' in cmd
+            'requires_sudo': requires_sudo
         }
     
     @staticmethod
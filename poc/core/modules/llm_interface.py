@@ -5,7 +5,50 @@ Extracted from roadnerd_server.py to improve modularity
 """
 
 import os
-from typing import Dict, Optional
+import threading
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from . import json_utils
+from .response_cache import TTLCache
+
+# Shared HTTP session so LLM calls reuse keep-alive connections
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Get or create the process-wide requests.Session used for LLM backends."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                session = requests.Session()
+                # urllib3 only retries idempotent methods on read errors, so a slow generate is never re-sent
+                retries = Retry(total=2, backoff_factor=0.1)
+                # One pooled socket per server worker thread (RN_WSGI_THREADS defaults to 16)
+                pool_size = int(os.getenv('RN_HTTP_POOL_SIZE', '16'))
+                session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                                                     max_retries=retries))
+                _http_session = session
+    return _http_session
+
+
+# Temperature-0 Ollama generations are deterministic, so identical requests (repeated diagnose
+# calls, the same prompt from several endpoints) are replayed from memory. Module-level because
+# update_llm_config() builds a new LLMInterface on every config change (RN_LLM_CACHE_TTL=0 disables).
+_generation_cache = TTLCache(maxsize=512, ttl=float(os.getenv('RN_LLM_CACHE_TTL', '3600')))
+
+# Replies that report a backend failure rather than generated text; never cached
+_FAILURE_PREFIXES = ('Ollama not available', 'No response from Ollama', 'Llamafile not available',
+                     'No response from llamafile', 'Unsupported LLM backend')
+
+
+def generation_cache_stats() -> Dict:
+    """Size and hit/miss counters of the temperature-0 generation cache."""
+    return _generation_cache.stats()
 
 
 class LLMInterface:
@@ -21,88 +64,184 @@ class LLMInterface:
         """
         self.llm_backend = llm_backend
         self.model = model
+
+        # Environment settings are read once per instance; update_llm_config()
+        # builds a fresh instance whenever the server configuration changes.
+        self.ollama_base = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+        self.llamafile_base = os.getenv('LLAMAFILE_BASE_URL', 'http://localhost:8081')
+        # (connect, read) seconds; a hung backend must not wedge a server thread forever
+        self.timeout = (2, float(os.getenv('RN_LLM_TIMEOUT', '120')))
+        # How long Ollama keeps the model resident after a request (avoids reload latency)
+        self.keep_alive = os.getenv('RN_KEEP_ALIVE', '30m')
+
+        # Use chat mode for GPT-OSS models (auto-detect) or when forced via env
+        use_chat_mode = os.getenv('RN_USE_CHAT_MODE', 'auto').lower()
+        self.use_chat = (use_chat_mode == 'force') or (use_chat_mode == 'auto' and model.startswith('gpt-oss'))
+        self.default_options = self._default_options(self.use_chat)
+
+    @staticmethod
+    def _default_options(chat: bool) -> Dict:
+        """Default Ollama options from the environment."""
+        if chat:
+            # GPT-OSS needs temperature=1.0, top_p=1.0 by default
+            return {
+                'temperature': float(os.getenv('RN_TEMP', '1.0')),
+                'top_p': float(os.getenv('RN_TOP_P', '1.0')),
+                'num_predict': int(os.getenv('RN_NUM_PREDICT', '128')),
+                'num_ctx': int(os.getenv('RN_NUM_CTX', '2048')),
+            }
+        # Standard models use previous defaults
+        return {
+            'temperature': float(os.getenv('RN_TEMP', '0')),
+            'num_predict': int(os.getenv('RN_NUM_PREDICT', '128')),
+            'num_ctx': int(os.getenv('RN_NUM_CTX', '2048')),
+        }
     
+    def _ollama_request(self, prompt: str, options_overrides: Optional[Dict], stream: bool) -> Tuple[str, Dict]:
+        """URL and payload for a prompt: chat API for GPT-OSS models, generate otherwise."""
+        options = dict(self.default_options)
+        if options_overrides:
+            options.update({k: v for k, v in options_overrides.items() if v is not None})
+
+        if self.use_chat:
+            # Use chat API for GPT-OSS models
+            return f'{self.ollama_base}/api/chat', {
+                'model': self.model,
+                'messages': [
+                    {'role': 'system', 'content': 'You are a helpful diagnostic assistant.'},
+                    {'role': 'user', 'content': prompt}
+                ],
+                'stream': stream,
+                'keep_alive': self.keep_alive,
+                'options': options,
+            }
+        # Use generate API for standard models
+        return f'{self.ollama_base}/api/generate', {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': stream,
+            'keep_alive': self.keep_alive,
+            'options': options,
+        }
+
     def query_ollama(self, prompt: str, options_overrides: Optional[Dict] = None) -> str:
         """Query Ollama API - automatically selects chat vs generate based on model"""
         try:
-            import requests
-            base = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-            
-            # Check if we should use chat mode (auto-detect GPT-OSS models or force via env)
-            use_chat_mode = os.getenv('RN_USE_CHAT_MODE', 'auto').lower()
-            force_chat = (use_chat_mode == 'force') or (use_chat_mode == 'auto' and self.model.startswith('gpt-oss'))
-            
-            # Defaults from environment with GPT-OSS specific settings
-            if force_chat:
-                # GPT-OSS needs temperature=1.0, top_p=1.0 by default
-                options = {
-                    'temperature': float(os.getenv('RN_TEMP', '1.0')),
-                    'top_p': float(os.getenv('RN_TOP_P', '1.0')),
-                    'num_predict': int(os.getenv('RN_NUM_PREDICT', '128')),
-                    'num_ctx': int(os.getenv('RN_NUM_CTX', '2048')),
-                }
-            else:
-                # Standard models use previous defaults
-                options = {
-                    'temperature': float(os.getenv('RN_TEMP', '0')),
-                    'num_predict': int(os.getenv('RN_NUM_PREDICT', '128')),
-                    'num_ctx': int(os.getenv('RN_NUM_CTX', '2048')),
-                }
-            
-            if options_overrides:
-                options.update({k: v for k, v in options_overrides.items() if v is not None})
-            
-            if force_chat:
-                # Use chat API for GPT-OSS models
-                payload = {
-                    'model': self.model,
-                    'messages': [
-                        {'role': 'system', 'content': 'You are a helpful diagnostic assistant.'},
-                        {'role': 'user', 'content': prompt}
-                    ],
-                    'stream': False,
-                    'options': options,
-                }
-                response = requests.post(f'{base}/api/chat', json=payload)
-                result = response.json()
+            url, payload = self._ollama_request(prompt, options_overrides, stream=False)
+            result = json_utils.loads(get_http_session().post(url, json=payload, timeout=self.timeout).content)
+            if self.use_chat:
                 if 'message' in result and 'content' in result['message']:
                     return result['message']['content']
                 else:
                     return result.get('response', 'No response from Ollama chat API')
-            else:
-                # Use generate API for standard models
-                payload = {
-                    'model': self.model,
-                    'prompt': prompt,
-                    'stream': False,
-                    'options': options,
-                }
-                response = requests.post(f'{base}/api/generate', json=payload)
-                return response.json().get('response', 'No response from Ollama')
+            return result.get('response', 'No response from Ollama')
         except Exception as e:
             return f"Ollama not available: {e}"
+
+    def _ollama_chunks(self, prompt: str, options_overrides: Optional[Dict] = None) -> Iterator[str]:
+        """Yield generated text pieces from a streaming Ollama request as they arrive.
+
+        Closing the generator closes the connection, and Ollama cancels the request.
+        """
+        try:
+            url, payload = self._ollama_request(prompt, options_overrides, stream=True)
+            produced = False
+            with get_http_session().post(url, json=payload, timeout=self.timeout, stream=True) as response:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json_utils.loads(line)
+                    if 'error' in chunk and not produced:
+                        yield f"Ollama not available: {chunk['error']}"
+                        return
+                    piece = chunk.get('message', {}).get('content', '') if self.use_chat else chunk.get('response', '')
+                    if piece:
+                        produced = True
+                        yield piece
+                    if chunk.get('done'):
+                        return
+        except Exception as e:
+            yield f"Ollama not available: {e}"
+
+    def stream_ollama(self, prompt: str, stop: Callable[[str], bool],
+                      options_overrides: Optional[Dict] = None) -> str:
+        """Stream an Ollama generation and hang up as soon as `stop(text so far)` is true,
+        so tokens after the useful part of the answer are never decoded."""
+        text = ''
+        chunks = self._ollama_chunks(prompt, options_overrides)
+        for piece in chunks:
+            text += piece
+            if stop(text):
+                chunks.close()
+                break
+        return text or 'No response from Ollama'
+
+    def stream_response(self, prompt: str, *, temperature: Optional[float] = None,
+                        num_predict: Optional[int] = None, top_p: Optional[float] = None) -> Iterator[str]:
+        """Yield the response in pieces as it is generated (Ollama); other backends yield it whole."""
+        overrides = {'temperature': temperature, 'num_predict': num_predict, 'top_p': top_p}
+        if self.llm_backend == 'ollama':
+            yield from self._ollama_chunks(prompt, options_overrides=overrides)
+        else:
+            yield self.get_response(prompt, temperature=temperature, num_predict=num_predict, top_p=top_p)
+    
+    def warm_up(self) -> bool:
+        """Load the Ollama model ahead of the first request (best-effort)."""
+        if self.llm_backend != 'ollama':
+            return False
+        try:
+            # A generate call without a prompt only loads the model and applies keep_alive
+            response = get_http_session().post(
+                f'{self.ollama_base}/api/generate',
+                json={'model': self.model, 'keep_alive': self.keep_alive},
+                timeout=self.timeout,
+            )
+            return response.status_code == 200
+        except Exception:
+            return False
     
     def query_llamafile(self, prompt: str, options_overrides: Optional[Dict] = None) -> str:
         """Query llamafile server"""
         try:
-            import requests
-            base = os.getenv('LLAMAFILE_BASE_URL', 'http://localhost:8081')
-            response = requests.post(f'{base}/completion', json={'prompt': prompt, 'n_predict': 200})
-            return response.json().get('content', 'No response from llamafile')
+            session = get_http_session()
+            base = self.llamafile_base
+            response = session.post(f'{base}/completion', json={'prompt': prompt, 'n_predict': 200}, timeout=self.timeout)
+            return json_utils.loads(response.content).get('content', 'No response from llamafile')
         except Exception as e:
             return f"Llamafile not available: {e}"
     
     def get_response(self, prompt: str, *, temperature: Optional[float] = None, 
-                     num_predict: Optional[int] = None, top_p: Optional[float] = None) -> str:
-        """Get response from configured LLM with optional per-request options."""
+                     num_predict: Optional[int] = None, top_p: Optional[float] = None,
+                     stop: Optional[Callable[[str], bool]] = None) -> str:
+        """Get response from configured LLM with optional per-request options.
+
+        `stop` lets Ollama generations end early once the partial text is usable.
+        """
         overrides = {'temperature': temperature, 'num_predict': num_predict, 'top_p': top_p}
+        if self.llm_backend == 'ollama' and stop is not None:
+            return self.stream_ollama(prompt, stop, options_overrides=overrides)
         if self.llm_backend == 'ollama':
-            return self.query_ollama(prompt, options_overrides=overrides)
+            return self._cached_query_ollama(prompt, overrides)
         elif self.llm_backend == 'llamafile':
             return self.query_llamafile(prompt, options_overrides=overrides)
         else:
             return f"Unsupported LLM backend: {self.llm_backend}"
     
+    def _cached_query_ollama(self, prompt: str, overrides: Dict) -> str:
+        """query_ollama, replayed from _generation_cache when the effective temperature is 0."""
+        options = dict(self.default_options)
+        options.update({k: v for k, v in overrides.items() if v is not None})
+        if options.get('temperature'):
+            return self.query_ollama(prompt, options_overrides=overrides)
+        key = TTLCache.make_key(self.llm_backend, self.model, self.use_chat, prompt,
+                                options.get('num_predict'), options.get('top_p'), options.get('num_ctx'))
+        text = _generation_cache.get(key)
+        if text is None:
+            text = self.query_ollama(prompt, options_overrides=overrides)
+            if text and not text.startswith(_FAILURE_PREFIXES):
+                _generation_cache.set(key, text)
+        return text
+    
     # Static methods for backward compatibility with existing code
     @staticmethod
     def query_ollama_static(prompt: str, model: str, options_overrides: Optional[Dict] = None) -> str:
@@ -0,0 +1,145 @@
+"""
+Response cache module for RoadNerd
+
+Small thread-safe LRU cache with a per-entry TTL, used to serve repeated
+LLM prompts and brainstorm requests without another generation.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable key for a tuple of request parts."""
+        raw = '\x1f'.join(repr(p) for p in parts)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Entry count and lookup hit/miss counters since start."""
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache:
+    """Serve paraphrased issues from cache by embedding similarity.
+
+    Uses sentence-transformers (MiniLM) when it is installed, like the
+    classifier and retriever; otherwise the cache stays disabled. Tests and
+    callers may pass their own `encoder(text) -> vector`.
+    """
+
+    def __init__(self, threshold: float = 0.90, maxsize: int = 256, ttl: float = 3600.0, encoder=None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._encoder = encoder
+        self._encoder_loaded = encoder is not None
+        self._entries: List[tuple] = []  # (stored_at, scope, unit vector, text, value)
+        self._lock = threading.Lock()
+
+    def _encode(self, text: str):
+        if not self._encoder_loaded:
+            with self._lock:
+                if not self._encoder_loaded:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        model = SentenceTransformer('all-MiniLM-L6-v2')
+                        self._encoder = lambda t: model.encode(t, convert_to_numpy=True)
+                    except Exception:
+                        self._encoder = None
+                    self._encoder_loaded = True
+        if self._encoder is None:
+            return None
+        try:
+            vec = [float(x) for x in self._encoder(text)]
+        except Exception:
+            return None
+        norm = math.sqrt(sum(x * x for x in vec))
+        return [x / norm for x in vec] if norm else None
+
+    def get(self, scope: str, text: str) -> Optional[Tuple[Any, str, float]]:
+        """Return (value, stored text, similarity) of the closest live entry in scope, if close enough."""
+        if self.maxsize <= 0 or self.ttl <= 0 or not self._entries:
+            return None
+        vec = self._encode(text)
+        if vec is None:
+            return None
+        now = time.monotonic()
+        best = None
+        with self._lock:
+            self._entries = [e for e in self._entries if now - e[0] <= self.ttl]
+            for _, entry_scope, entry_vec, entry_text, value in self._entries:
+                if entry_scope != scope:
+                    continue
+                sim = sum(a * b for a, b in zip(entry_vec, vec))
+                if sim >= self.threshold and (best is None or sim > best[2]):
+                    best = (value, entry_text, sim)
+        return best
+
+    def set(self, scope: str, text: str, value: Any) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        vec = self._encode(text)
+        if vec is None:
+            return
+        with self._lock:
+            self._entries.append((time.monotonic(), scope, vec, text, value))
+            if len(self._entries) > self.maxsize:
+                del self._entries[:len(self._entries) - self.maxsize]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -5,71 +5,204 @@ Provides safe system information gathering and connectivity checks.
 Extracted from roadnerd_server.py for modular architecture.
 """
 
+import copy
+import functools
+import os
 import platform
+import re
 import socket
 import subprocess
-from typing import Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Issue wording that calls for live connectivity probes in the prompt context
+_NEEDS_NET_RE = re.compile(r'wi-?fi|wireless|dns|network|connect|internet|resolv|ethernet|vpn', re.IGNORECASE)
+
+# A local address in /proc/net/fib_trie: "|-- 10.55.0.1" followed by "/32 host LOCAL"
+_FIB_LOCAL_RE = re.compile(r'\|-- (\d+\.\d+\.\d+\.\d+)\n\s+/32 host LOCAL')
+
+
+def _ttl_cache(seconds: float):
+    """Memoize a no-argument function for `seconds`; callers get a copy, fn.cache_clear() resets."""
+    def decorator(fn):
+        lock = threading.Lock()
+        entry = []  # [expires_at, value] once computed
+
+        @functools.wraps(fn)
+        def wrapper():
+            with lock:
+                if not entry or time.monotonic() >= entry[0]:
+                    entry[:] = [time.monotonic() + seconds, fn()]
+                return copy.copy(entry[1])
+
+        wrapper.cache_clear = entry.clear
+        return wrapper
+    return decorator
+
+
+def _read_distro() -> Optional[str]:
+    """PRETTY_NAME from os-release on Linux ('Unknown Linux' if unreadable, None elsewhere)"""
+    if _PLATFORM != 'Linux':
+        return None
+    try:
+        if hasattr(platform, 'freedesktop_os_release'):  # Python 3.10+
+            return platform.freedesktop_os_release().get('PRETTY_NAME')
+        with open('/etc/os-release') as f:
+            for line in f:
+                if line.startswith('PRETTY_NAME'):
+                    return line.split('=')[1].strip().strip('"')
+    except Exception:
+        return 'Unknown Linux'
+    return None
+
+
+# Fixed for the life of the process; only the hostname is read per call
+_PLATFORM = platform.system()
+_KERNEL = platform.release()
+_ARCH = platform.machine()
+_PYTHON = platform.python_version()
+_DISTRO = _read_distro()
 
 
 class SystemDiagnostics:
     """Gather system information safely"""
     
+    # Results are reused briefly: /api/status, diagnose, brainstorm and judge all ask on every
+    # request, and connectivity resolves DNS. Connectivity stays short-lived so a fix shows up
+    # within seconds.
     @staticmethod
+    @_ttl_cache(60)
     def get_system_info() -> Dict:
         """Get basic system information"""
         info = {
-            'platform': platform.system(),
+            'platform': _PLATFORM,
             'hostname': socket.gethostname(),
-            'kernel': platform.release(),
-            'arch': platform.machine(),
-            'python': platform.python_version()
+            'kernel': _KERNEL,
+            'arch': _ARCH,
+            'python': _PYTHON
         }
-        
-        # Add distro info for Linux
-        if platform.system() == 'Linux':
-            try:
-                with open('/etc/os-release') as f:
-                    for line in f:
-                        if line.startswith('PRETTY_NAME'):
-                            info['distro'] = line.split('=')[1].strip().strip('"')
-                            break
-            except:
-                info['distro'] = 'Unknown Linux'
-        
+        if _DISTRO is not None:
+            info['distro'] = _DISTRO
         return info
     
     @staticmethod
+    @_ttl_cache(5)
     def check_connectivity() -> Dict:
         """Check various connectivity aspects"""
-        checks = {}
-        
-        # Check DNS
-        try:
-            socket.gethostbyname('google.com')
-            checks['dns'] = 'working'
-        except:
-            checks['dns'] = 'failed'
-        
-        # Check default gateway
+        # The DNS lookup (up to RN_DNS_TIMEOUT) and the `ip` fallbacks are independent;
+        # run them side by side so the check takes the slowest probe, not their sum
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            dns = pool.submit(SystemDiagnostics._dns_status, 'google.com')
+            gateway = pool.submit(SystemDiagnostics._gateway_status)
+            interfaces = SystemDiagnostics._interfaces_up()
+            return {'dns': dns.result(), 'gateway': gateway.result(), 'interfaces': interfaces}
+
+    @staticmethod
+    def _gateway_status() -> str:
+        """Default gateway state (kernel table on Linux, `ip route` elsewhere)"""
+        has_default = SystemDiagnostics._proc_has_default_route()
+        if has_default is not None:
+            return 'configured' if has_default else 'missing'
         try:
             result = subprocess.run(['ip', 'route'], capture_output=True, text=True)
-            checks['gateway'] = 'configured' if 'default' in result.stdout else 'missing'
+            return 'configured' if 'default' in result.stdout else 'missing'
         except:
-            checks['gateway'] = 'unknown'
-        
-        # Check interfaces
+            return 'unknown'
+
+    @staticmethod
+    def _interfaces_up() -> int:
+        """Number of interfaces that are up"""
+        up = SystemDiagnostics._sysfs_interfaces_up()
+        if up is not None:
+            return up
         try:
             result = subprocess.run(['ip', 'link'], capture_output=True, text=True)
-            checks['interfaces'] = result.stdout.count('state UP')
+            return result.stdout.count('state UP')
         except:
-            checks['interfaces'] = 0
-        
-        return checks
+            return 0
+
+    # Linux exposes routes, link state and addresses directly; reading them avoids forking
+    # `ip` on every check. Each helper returns None when unavailable so callers fall back.
+    @staticmethod
+    def _proc_has_default_route() -> Optional[bool]:
+        """Whether /proc/net/route has a 0.0.0.0 destination"""
+        try:
+            with open('/proc/net/route') as f:
+                next(f, None)  # header
+                return any(line.split()[1:2] == ['00000000'] for line in f)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _sysfs_interfaces_up() -> Optional[int]:
+        """Number of interfaces whose operstate is 'up' (what `ip link` shows as state UP)"""
+        try:
+            names = os.listdir('/sys/class/net')
+        except OSError:
+            return None
+        up = 0
+        for name in names:
+            try:
+                with open(f'/sys/class/net/{name}/operstate') as f:
+                    up += f.read().strip() == 'up'
+            except OSError:
+                continue
+        return up
+
+    @staticmethod
+    def _proc_ipv4_addresses() -> Optional[List[str]]:
+        """Every local IPv4 address, secondary ones included, from the kernel's FIB"""
+        try:
+            with open('/proc/net/fib_trie') as f:
+                text = f.read()
+        except OSError:
+            return None
+        # The Main and Local tables both list each address; keep first occurrences
+        return [a for a in dict.fromkeys(_FIB_LOCAL_RE.findall(text)) if a != '127.0.0.1']
+
+    @staticmethod
+    def _dns_status(host: str) -> str:
+        """'working'/'failed' for a lookup, or 'timeout' after RN_DNS_TIMEOUT seconds.
+
+        The resolver's own timeout (5s per server, with retries) would otherwise stall the
+        request exactly when DNS is broken; a hung lookup is left to finish in a daemon thread.
+        """
+        result = []
+
+        def lookup():
+            try:
+                socket.gethostbyname(host)
+                result.append('working')
+            except Exception:
+                result.append('failed')
+
+        worker = threading.Thread(target=lookup, daemon=True)
+        worker.start()
+        worker.join(float(os.getenv('RN_DNS_TIMEOUT', '2')))
+        return result[0] if result else 'timeout'
+
+    @staticmethod
+    def needs_connectivity(issue: str) -> bool:
+        """Whether an issue mentions anything network related"""
+        return bool(_NEEDS_NET_RE.search(issue or ''))
+
+    @staticmethod
+    def connectivity_for(issue: str) -> Dict:
+        """Connectivity checks for network-related issues; placeholders otherwise"""
+        if SystemDiagnostics.needs_connectivity(issue):
+            return SystemDiagnostics.check_connectivity()
+        return {'dns': 'not_checked', 'gateway': 'not_checked', 'interfaces': 'not_checked'}
 
     @staticmethod
+    @_ttl_cache(10)
     def ipv4_addresses() -> List[str]:
         """List IPv4 addresses for all non-loopback interfaces"""
-        addrs: List[str] = []
+        addrs = SystemDiagnostics._proc_ipv4_addresses()
+        if addrs:
+            return addrs
+        addrs = []
         try:
             result = subprocess.run(['ip', '-4', '-o', 'addr', 'show'], capture_output=True, text=True)
             for line in result.stdout.splitlines():
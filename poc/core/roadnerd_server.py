@@ -4,28 +4,84 @@ RoadNerd Server - The "Smart Friend" Component
 Run this on your BeeLink or second laptop with LLM installed
 """
 
-import json
+import atexit
+import hashlib
+import itertools
+import queue
 import sys
+from functools import lru_cache
 from pathlib import Path
 import subprocess
-import platform
 import os
+import re
 from datetime import datetime
 from typing import Dict, List, Optional
-import socket
-import shutil
-from pathlib import Path
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Imports (do not auto-install; fail with guidance)
 try:
-    from flask import Flask, request, jsonify, render_template_string, render_template, send_file, make_response
+    from flask import Flask, Response, request, jsonify, render_template, send_file, make_response, stream_with_context
     from flask_cors import CORS
 except ImportError:
     print("Missing dependencies for RoadNerd server: flask, flask-cors")
     print("Activate your venv (RN_VENV) and run: pip install flask flask-cors")
     sys.exit(1)
+from flask.json.provider import DefaultJSONProvider
+
+# Optional accelerator for JSON request/response bodies
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: only the profiling endpoint samples CPU/RAM
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; falls back to the stdlib for unsupported values."""
+
+    def _option(self, sort_keys: bool, indent: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = self._option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """jsonify() without the bytes -> str -> bytes round trip (idea/probe payloads get large)."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._option(self.sort_keys, indent))
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)  # Allow cross-origin requests
 
 # Static asset version (for cache busting)
@@ -33,6 +89,9 @@ try:
     app.config['ASSET_VER'] = os.getenv('RN_ASSET_VER') or datetime.now().strftime('%Y%m%d%H%M%S')
 except Exception:
     app.config['ASSET_VER'] = '0'
+# Behind Apache/lighttpd (mod_xsendfile), let the front server stream downloads such as the
+# multi-GB model tarball straight from disk; without such a proxy the body would be empty
+app.config['USE_X_SENDFILE'] = os.getenv('RN_X_SENDFILE', '0').lower() in ('1', 'true', 'yes', 'on')
 
 
 @app.after_request
@@ -58,8 +117,10 @@ except Exception:
 # Import modular components
 from modules.system_diagnostics import SystemDiagnostics
 from modules.command_executor import CommandExecutor
-from modules.llm_interface import LLMInterface
+from modules.llm_interface import LLMInterface, generation_cache_stats, get_http_session
+from modules.response_cache import SemanticCache, TTLCache
 from modules.brainstorm_engine import Idea, BrainstormEngine, JudgeEngine, TemplateLoader
+from modules import json_utils
 
 # Configuration
 CONFIG = {
@@ -72,6 +133,8 @@ CONFIG = {
 
 # Environment overrides for easy experimentation
 CONFIG['llm_backend'] = os.getenv('RN_LLM_BACKEND', CONFIG['llm_backend'])
+# Any Ollama tag works; 4-bit quantized tags (e.g. llama3.2:1b-instruct-q4_K_M, the default
+# q4_K_M builds) read fewer bytes per decoded token and are the fast choice on small hardware
 CONFIG['model'] = os.getenv('RN_MODEL', CONFIG['model'])
 try:
     CONFIG['port'] = int(os.getenv('RN_PORT', str(CONFIG['port'])))
@@ -140,6 +203,59 @@ KNOWLEDGE_BASE = {
 }
 
 
+def _build_kb_index(kb: Dict) -> tuple:
+    """Map each lowercased symptom to (entry order, entry key) and compile one matcher."""
+    index = {}
+    for order, (key, details) in enumerate(kb.items()):
+        for symptom in details['symptoms']:
+            index[symptom.lower()] = (order, key)
+    pattern = re.compile('|'.join(re.escape(s) for s in sorted(index, key=len, reverse=True)))
+    return index, pattern
+
+
+_KB_SYMPTOMS, _KB_SYMPTOM_RE = _build_kb_index(KNOWLEDGE_BASE)
+
+# Brainstorm idea category for each KB entry
+_KB_IDEA_CATEGORY = {'dns_issues': 'dns', 'disk_space': 'disk', 'network_issues': 'network'}
+
+
+def _kb_entry(issue: str) -> Optional[str]:
+    """Key of the KB entry whose symptom appears in the issue (later entries win, as before)."""
+    hits = [_KB_SYMPTOMS[m.group()] for m in _KB_SYMPTOM_RE.finditer(issue.lower())]
+    if not hits:
+        return None
+    return max(hits)[1]
+
+
+def _kb_lookup(issue: str) -> Optional[Dict]:
+    """Return the first solution of the matching KB entry."""
+    key = _kb_entry(issue)
+    return KNOWLEDGE_BASE[key]['solutions'][0] if key else None
+
+
+def _kb_ideas(issue: str) -> List[Idea]:
+    """Deterministic brainstorm ideas from the matching KB entry's solutions."""
+    key = _kb_entry(issue)
+    if key is None:
+        return []
+    return [Idea(hypothesis=sol['name'], category=_KB_IDEA_CATEGORY.get(key, 'general'),
+                 why='Matches a known symptom in the built-in knowledge base',
+                 checks=[sol['check']], fixes=list(sol['commands']), risk='low', confidence=0.9)
+            for sol in KNOWLEDGE_BASE[key]['solutions']]
+
+def _kb_direct_enabled(data: Dict) -> bool:
+    """Whether a KB hit may replace the LLM call (request "kb_direct" overrides RN_KB_DIRECT)."""
+    if isinstance(data, dict) and data.get('kb_direct') is not None:
+        return bool(data['kb_direct'])
+    return os.getenv('RN_KB_DIRECT', '1').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _kb_suggestion(solution: Dict) -> str:
+    """Render a KB solution in the same shape as an LLM suggestion."""
+    lines = [f"Known fix: {solution['name']}", "Check:", f"  {solution['check']}", "Fix:"]
+    lines += [f"  {cmd}" for cmd in solution['commands']]
+    return '\n'.join(lines)
+
 def get_llm_interface():
     """Get or create the global LLM interface instance"""
     global llm_interface
@@ -153,6 +269,74 @@ def update_llm_config():
     llm_interface = LLMInterface(CONFIG['llm_backend'], CONFIG['model'])
 
 
+# Repeated LLM prompts / brainstorm requests are served from memory (RN_CACHE_TTL=0 disables)
+_response_cache = TTLCache(maxsize=int(os.getenv('RN_CACHE_SIZE', '256')),
+                           ttl=float(os.getenv('RN_CACHE_TTL', '3600')))
+
+# Paraphrased brainstorm issues ("wifi keeps dropping" / "wifi drops all the time") reuse a
+# cached run when their MiniLM embeddings are this close; inert without sentence-transformers
+_semantic_cache = SemanticCache(
+    threshold=float(os.getenv('RN_SEMANTIC_CACHE_THRESHOLD', '0.90')),
+    maxsize=int(os.getenv('RN_CACHE_SIZE', '256')) if os.getenv('RN_SEMANTIC_CACHE', '1').lower() in ('1', 'true', 'yes', 'on') else 0,
+    ttl=float(os.getenv('RN_CACHE_TTL', '3600')))
+
+def _ollama_get(path: str, timeout: float = 5):
+    """GET an Ollama API path over the shared keep-alive session (never blocks indefinitely)."""
+    base = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+    return get_http_session().get(f'{base}{path}', timeout=timeout)
+
+
+# The UI polls the model list; keep Ollama's /api/tags answer for a few seconds (RN_TAGS_TTL)
+_tags_cache = TTLCache(maxsize=1, ttl=float(os.getenv('RN_TAGS_TTL', '5')))
+
+
+def _ollama_models() -> Optional[List[Dict]]:
+    """Installed Ollama models from /api/tags, or None when Ollama answers with an error."""
+    models = _tags_cache.get('tags')
+    if models is None:
+        response = _ollama_get('/api/tags')
+        if response.status_code != 200:
+            return None
+        models = response.json().get('models', [])
+        _tags_cache.set('tags', models)
+    return models
+
+
+# Classification and retrieval (Phase A scaffolding)
+try:
+    import classify as _clf  # local directory
+    import retrieval as _ret
+except Exception:  # pragma: no cover
+    import poc.core.classify as _clf  # fallback for different sys.path layouts
+    import poc.core.retrieval as _ret
+
+
+# Both load MiniLM when sentence-transformers is installed and the retriever reads its
+# docs corpus, so build them on first use and share them across requests
+@lru_cache(maxsize=None)
+def _classifier():
+    return _clf.CategoryClassifier()
+
+
+@lru_cache(maxsize=None)
+def _retriever():
+    return _ret.HybridRetriever()
+
+
+# A session usually diagnoses and then brainstorms the same issue; reuse its snippets
+_retrieval_cache = TTLCache(maxsize=512, ttl=float(os.getenv('RN_RETRIEVAL_CACHE_TTL', '300')))
+
+
+def _retrieve(issue: str, category_hint: Optional[str], k: int = 3) -> list:
+    """Retriever snippets for an issue, cached briefly per (issue, category_hint, k)."""
+    key = _retrieval_cache.make_key(issue, category_hint, k)
+    snippets = _retrieval_cache.get(key)
+    if snippets is None:
+        snippets = _retriever().search(issue, category_hint=category_hint, k=k)
+        _retrieval_cache.set(key, snippets)
+    return snippets
+
+
 # Prompt loader and simple templating
 def _load_template(kind: str, category_hint: Optional[str] = None) -> str:
     """Legacy wrapper for TemplateLoader.load_template"""
@@ -171,25 +355,59 @@ def _render_template(tpl: str, ctx: Dict[str, str]) -> str:
 
 # Helper Functions for Routes
 
+def _json_body() -> Dict:
+    """Request JSON object, or {} for a missing/malformed/non-object body (handlers answer 400)."""
+    data = request.get_json(silent=True, cache=False)
+    return data if isinstance(data, dict) else {}
+
+_WORD_RE = re.compile(r'\S+')
+
+def _word_count(text: str) -> int:
+    """Whitespace word count (the logged token estimate) without building the word list."""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+@lru_cache(maxsize=1024)
+def _issue_digest(issue: str) -> str:
+    """Stable short digest of an issue for correlating log records across runs."""
+    return hashlib.blake2b(issue.encode('utf-8'), digest_size=8).hexdigest()
+
+# Run records are written by one background thread so /api/* responses never wait on disk
+_llm_log_queue: "queue.Queue[Dict]" = queue.Queue()
+_llm_log_writer = None
+_llm_log_writer_lock = threading.Lock()
+
+def _write_llm_logs() -> None:
+    """Drain queued run records into logs/llm_runs/YYYYMMDD.jsonl, keeping the file open per burst."""
+    day, handle = None, None
+    while True:
+        record = _llm_log_queue.get()
+        try:
+            today = datetime.now().strftime('%Y%m%d')
+            if today != day or handle is None:
+                # Resolve RN_LOG_DIR once per burst/day rather than per record
+                if handle:
+                    handle.close()
+                day, handle = today, (_logs_dir() / f"{today}.jsonl").open('a')
+            handle.write(json_utils.dumps(record) + "\n")
+        except Exception:
+            # Never break the API on logging errors
+            pass
+        finally:
+            if _llm_log_queue.qsize() == 0 and handle:
+                handle.close()
+                day, handle = None, None
+            _llm_log_queue.task_done()
+
 def _log_llm_run(record: Dict) -> None:
-    """Append a single JSON record to logs/llm_runs/YYYYMMDD.jsonl (best-effort)."""
-    try:
-        # Prefer RN_LOG_DIR if set; otherwise use repo-root logs directory
-        env_log_dir = os.getenv('RN_LOG_DIR')
-        if env_log_dir:
-            logs_dir = Path(env_log_dir)
-        else:
-            # Resolve repo root as .../RoadNerd from this file location
-            repo_root = Path(__file__).resolve().parents[2]
-            logs_dir = repo_root / 'logs' / 'llm_runs'
-        logs_dir.mkdir(parents=True, exist_ok=True)
-        date = datetime.now().strftime('%Y%m%d')
-        out = logs_dir / f'{date}.jsonl'
-        with out.open('a') as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    except Exception as _:
-        # Never break the API on logging errors
-        pass
+    """Queue a single JSON record for logs/llm_runs/YYYYMMDD.jsonl (best-effort)."""
+    global _llm_log_writer
+    if _llm_log_writer is None:
+        with _llm_log_writer_lock:
+            if _llm_log_writer is None:
+                _llm_log_writer = threading.Thread(target=_write_llm_logs, name='rn-llm-log', daemon=True)
+                _llm_log_writer.start()
+                atexit.register(_llm_log_queue.join)
+    _llm_log_queue.put(record)
 
 def _logs_dir() -> Path:
     """Resolve the logs directory honoring RN_LOG_DIR, else repo logs/llm_runs."""
@@ -203,6 +421,37 @@ def _logs_dir() -> Path:
     d.mkdir(parents=True, exist_ok=True)
     return d
 
+# Shared pool for fanning out short blocking probes (subprocesses) within a request
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+def _io_pool() -> ThreadPoolExecutor:
+    """Get or create the shared I/O thread pool (size via RN_IO_WORKERS)."""
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            workers = int(os.getenv('RN_IO_WORKERS', '8'))
+            _io_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rn-io')
+    return _io_executor
+
+def _command_output(cmd: List[str]) -> str:
+    """Run a read-only command and return its stdout."""
+    return subprocess.run(cmd, capture_output=True, text=True).stdout
+
+
+# Interfaces and routes change rarely; polling clients get the last output for a few seconds
+_scan_cache = TTLCache(maxsize=8, ttl=float(os.getenv('RN_SCAN_TTL', '3')))
+
+
+def _cached_command_output(cmd: List[str]) -> str:
+    """_command_output served from _scan_cache (failures are not cached)."""
+    key = _scan_cache.make_key(*cmd)
+    output = _scan_cache.get(key)
+    if output is None:
+        output = _command_output(cmd)
+        _scan_cache.set(key, output)
+    return output
+
 
 # BACKLOG++ Implementation: Brainstorm/Judge System
 # Classes moved to modules.brainstorm_engine for better organization
@@ -213,6 +462,25 @@ import uuid
 # UI & FRONTEND ROUTES
 # =====================================================================
 
+# Page templates only vary with ASSET_VER (static URLs), so render each once
+_page_cache: Dict[tuple, bytes] = {}
+_PAGE_MAX_AGE = int(os.getenv('RN_PAGE_MAX_AGE', '300'))
+
+
+def _static_page(template: str):
+    """Serve a rendered page template from memory with browser caching."""
+    asset_ver = app.config.get('ASSET_VER', '0')
+    key = (template, asset_ver, request.script_root)
+    body = _page_cache.get(key)
+    if body is None:
+        body = render_template(template, asset_ver=asset_ver).encode('utf-8')
+        _page_cache[key] = body
+    resp = make_response(body)
+    resp.mimetype = 'text/html'
+    resp.headers['Cache-Control'] = f'public, max-age={_PAGE_MAX_AGE}'
+    resp.set_etag(hashlib.sha256(body).hexdigest()[:16])
+    return resp.make_conditional(request)
+
 @app.route('/')
 def home():
     """Serve a simple web interface"""
@@ -220,7 +488,7 @@ def home():
     # The inline HTML below is kept temporarily for reference and will be removed
     # once Phase 2A extraction completes across all routes.
     try:
-        return render_template('home.html', asset_ver=app.config.get('ASSET_VER', '0'))
+        return _static_page('home.html')
     except Exception:
         # Fallback to legacy inline HTML if templates are not available
         pass
@@ -279,7 +547,7 @@ def home():
     </body>
     </html>
     '''
-    return render_template_string(html)
+    return html  # static markup; no Jinja syntax to render
 
 
 # =====================================================================
@@ -289,7 +557,7 @@ def home():
 @app.route('/api/model/switch', methods=['POST'])
 def api_model_switch():
     """Switch to a different model"""
-    data = request.get_json() or {}
+    data = _json_body()
     new_model = data.get('model')
     
     if not new_model:
@@ -297,11 +565,9 @@ def api_model_switch():
     
     # Verify model exists in Ollama
     try:
-        import requests
-        base = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-        response = requests.get(f'{base}/api/tags')
-        if response.status_code == 200:
-            available_models = [m['name'] for m in response.json().get('models', [])]
+        models = _ollama_models()
+        if models is not None:
+            available_models = [m['name'] for m in models]
             if new_model not in available_models:
                 return jsonify({
                     'error': f'Model {new_model} not found',
@@ -342,11 +608,8 @@ def api_model_switch():
 def api_model_list():
     """Get list of available models"""
     try:
-        import requests
-        base = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-        response = requests.get(f'{base}/api/tags')
-        if response.status_code == 200:
-            models = response.json().get('models', [])
+        models = _ollama_models()
+        if models is not None:
             return jsonify({
                 'current_model': CONFIG['model'],
                 'available_models': [
@@ -372,19 +635,15 @@ def api_model_list():
 @app.route('/api/profile/standard', methods=['POST'])
 def api_profile_standard():
     """Run standard profiling test on CURRENT model only"""
+    if psutil is None:
+        return jsonify({'error': 'Standard profile test failed: psutil is not installed'}), 500
     try:
-        import time
-        import psutil
-        import requests
-        import os
-        
         # Use the challenging 5-idea stress test
         test_issue = "My laptop turned dark green all over sudden... what happened?"
         
-        # Get baseline system metrics
-        process = psutil.Process()
-        cpu_before = psutil.cpu_percent(interval=1)
-        memory_before = psutil.virtual_memory()
+        # Prime psutil's counters without sleeping; the reading after the run is then the
+        # average CPU use over the brainstorm itself
+        psutil.cpu_percent(interval=None)
         
         payload = {
             'issue': test_issue,
@@ -396,23 +655,27 @@ def api_profile_standard():
         # Time the request
         start_time = time.time()
         
-        # Call our own brainstorm endpoint
-        response = requests.post(
-            'http://localhost:8080/api/ideas/brainstorm',
-            json=payload,
-            timeout=120  # Increased timeout for large models like 34B
-        )
+        # Run the brainstorm pipeline in-process; RN_PROFILE_OVER_HTTP=1 goes through our own
+        # /api/ideas/brainstorm instead, to include the HTTP layer in integration-style runs
+        if os.getenv('RN_PROFILE_OVER_HTTP', '0').lower() in ('1', 'true', 'yes', 'on'):
+            host = CONFIG['bind_host'] if CONFIG['bind_host'] not in ('0.0.0.0', '') else '127.0.0.1'
+            response = get_http_session().post(
+                f"http://{host}:{CONFIG['port']}/api/ideas/brainstorm",
+                json=payload,
+                timeout=(2, 120)  # Increased timeout for large models like 34B
+            )
+            result, status = json_utils.loads(response.content), response.status_code
+        else:
+            result, status = _run_brainstorm(payload)
         
         end_time = time.time()
         response_time = end_time - start_time
         
-        if response.status_code != 200:
-            raise Exception(f"Brainstorm API call failed: {response.status_code}")
-            
-        result = response.json()
+        if status != 200:
+            raise Exception(f"Brainstorm API call failed: {status}")
         
         # Get post-test system metrics  
-        cpu_after = psutil.cpu_percent(interval=1)
+        cpu_during = psutil.cpu_percent(interval=None)
         memory_after = psutil.virtual_memory()
         
         # Calculate performance metrics
@@ -425,10 +688,9 @@ def api_profile_standard():
         
         # Get model size info from Ollama
         try:
-            ollama_response = requests.get(f"{os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')}/api/tags", timeout=5)
+            models = _ollama_models()
             model_info = {}
-            if ollama_response.status_code == 200:
-                models = ollama_response.json().get('models', [])
+            if models is not None:
                 for m in models:
                     if m['name'] == model:
                         # Size is in bytes, convert to GB
@@ -446,7 +708,7 @@ def api_profile_standard():
             'response_time_sec': round(response_time, 2),
             'tokens_per_second': round(tokens_per_sec, 1),
             'estimated_tokens': round(estimated_tokens),
-            'cpu_usage_percent': round((cpu_before + cpu_after) / 2, 1),
+            'cpu_usage_percent': round(cpu_during, 1),
             'ram_usage_percent': round(memory_after.percent, 1),
             'ram_used_gb': round(memory_after.used / (1024**3), 1),
             'model_size_disk_gb': model_info.get('size_gb', 'unknown'),
@@ -541,7 +803,6 @@ def api_test_presets():
 def api_logs():
     """Return JSONL logs for a given date with optional filtering."""
     try:
-        import json as _json
         logs_dir = _logs_dir()
         date = request.args.get('date')
         mode = request.args.get('mode')
@@ -565,7 +826,7 @@ def api_logs():
                 if not line:
                     continue
                 try:
-                    obj = _json.loads(line)
+                    obj = json_utils.loads(line)
                     if mode and obj.get('mode') != mode:
                         continue
                     entries.append(obj)
@@ -639,7 +900,7 @@ def logs_view():
     </body>
     </html>
     '''
-    return render_template_string(html)
+    return html  # static markup; no Jinja syntax to render
 
 
 # =====================================================================
@@ -649,14 +910,18 @@ def logs_view():
 @app.route('/api/status', methods=['GET'])
 def api_status():
     """Return system status"""
+    system = SystemDiagnostics.get_system_info()  # already a private copy of the cached dict
+    system['ips'] = SystemDiagnostics.ipv4_addresses()
     return jsonify({
         'server': 'online',
         'timestamp': datetime.now().isoformat(),
-        'system': {**SystemDiagnostics.get_system_info(), 'ips': SystemDiagnostics.ipv4_addresses()},
+        'system': system,
         'connectivity': SystemDiagnostics.check_connectivity(),
         'llm_backend': CONFIG['llm_backend'],
         'model': CONFIG['model'],
-        'safe_mode': CONFIG['safe_mode']
+        'safe_mode': CONFIG['safe_mode'],
+        'cache': _response_cache.stats(),
+        'llm_cache': generation_cache_stats()
     })
 
 @app.route('/api-docs', methods=['GET'])
@@ -664,7 +929,7 @@ def api_docs():
     """Lightweight API console for browser testing"""
     # Presentation extracted: serve Jinja template with external JS/CSS (no inline scripts)
     try:
-        return render_template('api_console.html', asset_ver=app.config.get('ASSET_VER', '0'))
+        return _static_page('api_console.html')
     except Exception:
         # Fallback to legacy inline console if templates are not available
         pass
@@ -1091,13 +1356,13 @@ def api_docs():
     </body>
     </html>
     '''
-    return render_template_string(html)
+    return html  # static markup; no Jinja syntax to render
 
 
 @app.route('/bundle-ui', methods=['GET'])
 def bundle_ui():
     """Separate Bundle Management UI (scaffold)."""
-    return render_template('bundle-ui.html', asset_ver=app.config.get('ASSET_VER', '0'))
+    return _static_page('bundle-ui.html')
 
 
 # =====================================================================
@@ -1117,23 +1382,22 @@ def download_client():
 def download_models():
     """Serve cached models for patient bootstrap"""
     try:
-        from pathlib import Path
         models_path = Path.home() / '.roadnerd' / 'models' / 'ollama-models.tar.gz'
         if models_path.exists():
-            return send_file(str(models_path), as_attachment=True, download_name='ollama-models.tar.gz')
+            # send_file already answers If-None-Match/Range (304s, resumable transfers); the tarball
+            # only changes when re-cached, so clients may also reuse it without revalidating
+            return send_file(str(models_path), as_attachment=True, download_name='ollama-models.tar.gz',
+                             max_age=int(os.getenv('RN_MODELS_MAX_AGE', '86400')))
         else:
             return jsonify({'error': 'Model cache not found. Run profile-machine.py --cache-models first'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/bootstrap.sh', methods=['GET'])
-def bootstrap_script():
-    """Serve bootstrap script for patient setup"""
-    script = f'''#!/usr/bin/env bash
+_BOOTSTRAP_SCRIPT = '''#!/usr/bin/env bash
 # RoadNerd Patient Bootstrap Script
 set -euo pipefail
 
-NERD_URL="${{1:-http://10.55.0.1:8080}}"
+NERD_URL="${1:-http://10.55.0.1:8080}"
 INSTALL_DIR="$HOME/.roadnerd"
 
 echo "🤖 RoadNerd Patient Bootstrap"
@@ -1149,8 +1413,8 @@ curl -fsSL "$NERD_URL/download/client.py" -o roadnerd_client.py
 chmod +x roadnerd_client.py
 
 # Check machine capability
-TOTAL_RAM=$(free -m | awk 'NR==2{{printf "%.0f", $2}}')
-echo "📊 Detected ${{TOTAL_RAM}}MB RAM"
+TOTAL_RAM=$(free -m | awk 'NR==2{printf "%.0f", $2}')
+echo "📊 Detected ${TOTAL_RAM}MB RAM"
 
 if [ "$TOTAL_RAM" -gt 16000 ]; then
     echo "🚀 High-capacity machine - downloading model cache..."
@@ -1176,63 +1440,117 @@ else
     python3 roadnerd_client.py "$NERD_URL" 
 fi
 '''
-    
-    response = make_response(script)
-    response.headers['Content-Type'] = 'text/x-shellscript'
-    response.headers['Content-Disposition'] = 'attachment; filename="bootstrap.sh"'
-    return response
+_BOOTSTRAP_BYTES = _BOOTSTRAP_SCRIPT.encode('utf-8')
+
+@app.route('/bootstrap.sh', methods=['GET'])
+def bootstrap_script():
+    """Serve bootstrap script for patient setup"""
+    return Response(_BOOTSTRAP_BYTES, content_type='text/x-shellscript',
+                    headers={'Content-Disposition': 'attachment; filename="bootstrap.sh"'})
+
+# Background diagnose jobs (in-process, like bundle creation; no broker needed on the road)
+_diagnose_executor = None
+_diagnose_jobs: Dict[str, Dict] = {}
+_diagnose_jobs_lock = threading.Lock()
+_MAX_DIAGNOSE_JOBS = 100
+
+# Token budget for a diagnose suggestion; lower it for small/quantized models on slow hardware
+_DIAGNOSE_NUM_PREDICT = int(os.getenv('RN_DIAGNOSE_NUM_PREDICT', '192'))
+
+
+def _update_diagnose_job(job_id: str, **fields) -> None:
+    with _diagnose_jobs_lock:
+        if job_id in _diagnose_jobs:
+            _diagnose_jobs[job_id].update(fields)
+
+
+def _submit_diagnose_job(data: Dict) -> str:
+    """Queue a diagnose run on the worker pool and return its job id."""
+    global _diagnose_executor
+    job_id = uuid.uuid4().hex[:12]
+    with _diagnose_jobs_lock:
+        if _diagnose_executor is None:
+            workers = int(os.getenv('RN_DIAGNOSE_WORKERS', '2'))
+            _diagnose_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rn-diagnose')
+        # Forget the oldest finished jobs once the table is full
+        for old_id in list(_diagnose_jobs):
+            if len(_diagnose_jobs) < _MAX_DIAGNOSE_JOBS:
+                break
+            if _diagnose_jobs[old_id]['status'] in ('completed', 'failed'):
+                del _diagnose_jobs[old_id]
+        _diagnose_jobs[job_id] = {'status': 'queued', 'submitted': datetime.now().isoformat()}
+
+    def run():
+        _update_diagnose_job(job_id, status='running')
+        try:
+            _update_diagnose_job(job_id, status='completed', result=_run_diagnose(data))
+        except Exception as e:
+            _update_diagnose_job(job_id, status='failed', error=str(e))
+
+    _diagnose_executor.submit(run)
+    return job_id
+
 
 @app.route('/api/diagnose', methods=['POST'])
 def api_diagnose():
-    """Diagnose a system issue"""
-    data = request.json
+    """Diagnose a system issue. With {"async": true} queue it and poll /api/diagnose/<job_id>."""
+    data = _json_body()
+    if data.get('async'):
+        job_id = _submit_diagnose_job(data)
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+    return jsonify(_run_diagnose(data))
+
+
+@app.route('/api/diagnose/<job_id>', methods=['GET'])
+def api_diagnose_job(job_id):
+    """Get status (and result when completed) of a queued diagnose job"""
+    with _diagnose_jobs_lock:
+        job = dict(_diagnose_jobs.get(job_id) or {})
+    if not job:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify({'job_id': job_id, **job})
+
+
+def _run_diagnose(data: Dict) -> Dict:
+    """Classify, retrieve, consult the KB and LLM for an issue; returns the response payload."""
     issue = data.get('issue', '')
-    debug_flag = bool(data.get('debug')) if isinstance(data, dict) else False
+    issue_digest = _issue_digest(issue) if issue else None  # stable across runs, for correlating logs
+    debug_flag = bool(data.get('debug'))
     # Classification and retrieval (Phase A scaffolding)
-    try:
-        import classify as _clf  # local directory
-    except Exception:  # pragma: no cover
-        import poc.core.classify as _clf  # fallback for different sys.path layouts
-    try:
-        import retrieval as _ret
-    except Exception:  # pragma: no cover
-        import poc.core.retrieval as _ret
-
-    detector = _clf.InputDetector()
-    dtype = detector.detect(issue)
-    classifier = _clf.CategoryClassifier()
-    pred = classifier.classify(issue)
-    retriever = _ret.HybridRetriever()
-    snippets = retriever.search(issue, category_hint=pred.label, k=3)
+    dtype = _clf.InputDetector.detect(issue)
+    pred = _classifier().classify(issue)
+    snippets = _retrieve(issue, pred.label)
     retrieval_text = '\n'.join(f"- {s.text[:300]} (source: {Path(s.source).name})" for s in snippets)
     
     # Check knowledge base first
-    kb_solution = None
-    for problem_type, details in KNOWLEDGE_BASE.items():
-        for symptom in details['symptoms']:
-            if symptom in issue.lower():
-                kb_solution = details['solutions'][0]  # Get first solution
-                break
+    kb_solution = _kb_lookup(issue)
+    # A direct KB hit answers the issue without an LLM round-trip (opt out per request or via RN_KB_DIRECT=0)
+    kb_direct = bool(kb_solution) and _kb_direct_enabled(data)
     
-    # Prepare context for LLM (prompt template)
+    # Prepare context for LLM (prompt template); skip network probes for unrelated issues
     system_info = SystemDiagnostics.get_system_info()
-    connectivity = SystemDiagnostics.check_connectivity()
-    tpl = _load_template('diagnose', category_hint=pred.label)
-    ctx = {
-        'SYSTEM': json.dumps(system_info, ensure_ascii=False),
-        'CONNECTIVITY': json.dumps(connectivity, ensure_ascii=False),
-        'ISSUE': issue,
-        'CATEGORY_HINT': pred.label,
-        'RETRIEVAL': retrieval_text,
-    }
-    prompt = _render_template(tpl, ctx)
-    
-    llm_response = get_llm_interface().get_response(prompt, temperature=0.0, num_predict=192)
+    connectivity = SystemDiagnostics.connectivity_for(issue)
+    if kb_direct:
+        prompt = ''
+        llm_response = _kb_suggestion(kb_solution)
+    else:
+        tpl = _load_template('diagnose', category_hint=pred.label)
+        ctx = {
+            'SYSTEM': json_utils.dumps(system_info),
+            'CONNECTIVITY': json_utils.dumps(connectivity),
+            'ISSUE': issue,
+            'CATEGORY_HINT': pred.label,
+            'RETRIEVAL': retrieval_text,
+        }
+        prompt = _render_template(tpl, ctx)
+        llm_response = get_llm_interface().get_response(prompt, temperature=0.0, num_predict=_DIAGNOSE_NUM_PREDICT)
 
     response_payload = {
         'issue': issue,
+        'issue_digest': issue_digest,
         'kb_solution': kb_solution,
         'llm_suggestion': llm_response,
+        'source': 'kb' if kb_direct else 'llm',
         'system_context': system_info,
         'connectivity': connectivity,
         'classification': {
@@ -1248,7 +1566,7 @@ def api_diagnose():
                 for s in snippets
             ],
             'prompt_excerpt': prompt[:600],
-            'llm_options': {'temperature': 0.0, 'num_predict': 192}
+            'llm_options': None if kb_direct else {'temperature': 0.0, 'num_predict': _DIAGNOSE_NUM_PREDICT}
         }
 
     # Phase 0 logging (legacy mode)
@@ -1262,7 +1580,7 @@ def api_diagnose():
                 'intent_analysis': incoming.get('intent_analysis'),
                 'context_items': len(incoming.get('context', []) or [])
             },
-            'issue_hash': str(hash(issue)) if issue else None,
+            'issue_hash': issue_digest,
             'issue': issue,
             'server': {
                 'backend': CONFIG['llm_backend'],
@@ -1273,24 +1591,41 @@ def api_diagnose():
             'connectivity': connectivity,
             'result': {
                 'has_kb': bool(kb_solution),
-                'llm_tokens_est': len((llm_response or '').split()),
+                'kb_direct': kb_direct,
+                'llm_tokens_est': _word_count(llm_response or ''),
             }
         })
     except Exception:
         pass
 
-    return jsonify(response_payload)
+    return response_payload
+
+
+# Idempotent status reads that /api/execute may answer from cache: the bare status tools (option
+# flags only) and the plain `ip addr|route|link [show|list]` listings, nothing that takes arguments
+_EXEC_CACHEABLE_RE = re.compile(r'\s*(?:(?:uptime|df|free|lsblk|uname)(?:\s+-[A-Za-z-]+)*'
+                                r'|ip(?:\s+-[46])?\s+(?:addr|address|route|link)(?:\s+(?:show|list))?)\s*$')
+_exec_cache = TTLCache(maxsize=32, ttl=float(os.getenv('RN_EXEC_CACHE_TTL', '2')))
+
 
 @app.route('/api/execute', methods=['POST'])
 def api_execute():
     """Execute a command safely"""
-    data = request.json
+    data = _json_body()
     command = data.get('command', '')
     force = data.get('force', False)
     
-    if not command:
+    if not command or not command.strip():
         return jsonify({'error': 'No command provided'}), 400
     
+    # Dashboards poll the same read-only commands; serve repeats from a short-lived cache
+    cache_key = None
+    if not force and _EXEC_CACHEABLE_RE.match(command):
+        cache_key = _exec_cache.make_key(command.strip(), CONFIG['safe_mode'])
+        cached = _exec_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+    
     # Force execution is disabled unless explicitly allowed via RN_ALLOW_FORCE
     original_safe_mode = CONFIG['safe_mode']
     if force:
@@ -1304,6 +1639,8 @@ def api_execute():
     # Restore safe mode
     CONFIG['safe_mode'] = original_safe_mode
     
+    if cache_key and result.get('executed') and result.get('return_code') == 0:
+        _exec_cache.set(cache_key, result)
     return jsonify(result)
 
 
@@ -1314,12 +1651,13 @@ def api_execute():
 @app.route('/api/llm', methods=['POST'])
 def api_llm():
     """Direct LLM query"""
-    data = request.json
+    data = _json_body()
     prompt = data.get('prompt', '')
     
     if not prompt:
         return jsonify({'error': 'No prompt provided'}), 400
     
+    # Temperature-0 generations are replayed by LLMInterface's own generation cache
     response = get_llm_interface().get_response(prompt)
     
     return jsonify({
@@ -1329,13 +1667,33 @@ def api_llm():
         'backend': CONFIG['llm_backend']
     })
 
+@app.route('/api/llm/stream', methods=['POST'])
+def api_llm_stream():
+    """Direct LLM query streamed as Server-Sent Events ({"response": piece} ..., then {"done": true})"""
+    data = _json_body()
+    prompt = data.get('prompt', '')
+
+    if not prompt:
+        return jsonify({'error': 'No prompt provided'}), 400
+
+    llm = get_llm_interface()
+
+    def events():
+        for piece in llm.stream_response(prompt):
+            yield f"data: {json_utils.dumps({'response': piece})}\n\n"
+        yield f"data: {json_utils.dumps({'done': True, 'model': CONFIG['model'], 'backend': CONFIG['llm_backend']})}\n\n"
+
+    # No proxy/WSGI buffering: the client renders tokens as they are decoded
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/model', methods=['GET', 'POST'])
 def api_model():
     """Get or set the active LLM model (dynamic). POST {model}."""
     if request.method == 'GET':
         return jsonify({'backend': CONFIG['llm_backend'], 'model': CONFIG['model']})
 
-    data = request.get_json() or {}
+    data = _json_body()
     new_model = data.get('model')
     if not new_model:
         return jsonify({'error': 'Missing model'}), 400
@@ -1359,28 +1717,25 @@ def api_model():
 @app.route('/api/scan_network', methods=['GET'])
 def api_scan_network():
     """Scan for network issues"""
-    diagnostics = {}
-    
-    # Check each network interface
-    try:
-        result = subprocess.run(['ip', 'addr'], capture_output=True, text=True)
-        diagnostics['interfaces'] = result.stdout
-    except:
-        diagnostics['interfaces'] = 'Could not scan interfaces'
-    
-    # Check routing table
-    try:
-        result = subprocess.run(['ip', 'route'], capture_output=True, text=True)
-        diagnostics['routes'] = result.stdout
-    except:
-        diagnostics['routes'] = 'Could not get routes'
+    # (command, fallback text) per section; the probes run concurrently
+    probes = {
+        'interfaces': (['ip', 'addr'], 'Could not scan interfaces'),
+        'routes': (['ip', 'route'], 'Could not get routes'),
+    }
+    pool = _io_pool()
+    futures = {key: pool.submit(_cached_command_output, cmd) for key, (cmd, _) in probes.items()}
     
-    # Check DNS
+    diagnostics = {}
     try:
-        result = subprocess.run(['cat', '/etc/resolv.conf'], capture_output=True, text=True)
-        diagnostics['dns_config'] = result.stdout
-    except:
+        # A ~200 byte file: read it directly rather than forking `cat`
+        diagnostics['dns_config'] = Path('/etc/resolv.conf').read_text()
+    except OSError:
         diagnostics['dns_config'] = 'Could not read DNS config'
+    for key, future in futures.items():
+        try:
+            diagnostics[key] = future.result()
+        except Exception:
+            diagnostics[key] = probes[key][1]
     
     return jsonify(diagnostics)
 
@@ -1389,29 +1744,15 @@ def api_scan_network():
 # IDEAS & BRAINSTORM SYSTEM ROUTES (BACKLOG++)
 # =====================================================================
 
-@app.route('/api/ideas/brainstorm', methods=['POST'])
-def api_brainstorm():
-    """Generate multiple structured diagnostic ideas (high creativity)."""
-    data = request.get_json()
-    
-    if not data or 'issue' not in data:
-        return jsonify({'error': 'Missing issue parameter'}), 400
-    
-    issue = data['issue']
-    n = data.get('n', 5)  # Number of ideas to generate
-    creativity = data.get('creativity', 2)  # 0-3 scale
-    category_hint = data.get('category_hint')
-    debug = data.get('debug', False)  # Include diagnostic info
-
+def _brainstorm_grounding(issue: str, category_hint: Optional[str], kb_ideas: List, llm_needed: bool) -> tuple:
+    """Category hint, classification record and retrieval text for a brainstorm prompt."""
     # If no category_hint provided, attempt classification
     classification = None
-    if not category_hint:
-        try:
-            import classify as _clf
-        except Exception:  # pragma: no cover
-            import poc.core.classify as _clf
-        classifier = _clf.CategoryClassifier()
-        pred = classifier.classify(issue)
+    if not category_hint and kb_ideas and not llm_needed:
+        category_hint = kb_ideas[0].category
+        classification = {'label': category_hint, 'confidence': None, 'candidates': []}
+    elif not category_hint:
+        pred = _classifier().classify(issue)
         category_hint = pred.label
         classification = {'label': pred.label, 'confidence': pred.confidence, 'candidates': pred.candidates}
     else:
@@ -1419,47 +1760,97 @@ def api_brainstorm():
 
     # Retrieval snippets for prompt grounding
     retrieval_text = ''
-    try:
-        import retrieval as _ret
-    except Exception:  # pragma: no cover
-        import poc.core.retrieval as _ret
-    try:
-        retriever = _ret.HybridRetriever()
-        snippets = retriever.search(issue, category_hint=category_hint, k=3)
-        retrieval_text = '\n'.join(f"- {s.text[:300]} (source: {Path(s.source).name})" for s in snippets)
-    except Exception:
-        pass
+    if llm_needed:
+        try:
+            snippets = _retrieve(issue, category_hint)
+            retrieval_text = '\n'.join(f"- {s.text[:300]} (source: {Path(s.source).name})" for s in snippets)
+        except Exception:
+            pass
+    return category_hint, classification, retrieval_text
+
+def _run_brainstorm(data: Dict) -> tuple:
+    """Brainstorm ideas for data['issue']; returns (payload, HTTP status)."""
+    
+    if 'issue' not in data:
+        return {'error': 'Missing issue parameter'}, 400
+    
+    issue = data['issue']
+    n = data.get('n', 5)  # Number of ideas to generate
+    creativity = data.get('creativity', 2)  # 0-3 scale
+    category_hint = data.get('category_hint')
+    debug = data.get('debug', False)  # Include diagnostic info
+    if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+        return {'error': 'n must be a positive integer'}, 400
+
+    # Low-creativity runs are near-deterministic and can be replayed; creativity >= 2 samples
+    # hot enough that pinning one draw would defeat the point. Debug runs always go to the model.
+    # Whether the KB may answer changes the result, so it is part of both cache keys
+    kb_direct = _kb_direct_enabled(data)
+    cache_key = semantic_scope = None
+    if isinstance(creativity, int) and creativity < 2 and not debug:
+        cache_key = _response_cache.make_key('brainstorm', CONFIG['llm_backend'], CONFIG['model'],
+                                             issue, n, creativity, category_hint, kb_direct)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            meta = {**cached['meta'], 'timestamp': datetime.now().isoformat(), 'cached': True}
+            return {**cached, 'meta': meta}, 200
+        semantic_scope = _response_cache.make_key('brainstorm', CONFIG['llm_backend'], CONFIG['model'],
+                                                  n, creativity, category_hint, kb_direct)
+        similar = _semantic_cache.get(semantic_scope, issue)
+        if similar is not None:
+            cached, cached_issue, similarity = similar
+            meta = {**cached['meta'], 'timestamp': datetime.now().isoformat(), 'cached': True,
+                    'cached_issue': cached_issue, 'similarity': round(similarity, 3)}
+            return {**cached, 'meta': meta}, 200
+
+    # Known KB symptoms yield canned ideas; the model is only asked for the remainder
+    kb_ideas = _kb_ideas(issue)[:n] if kb_direct else []
+    llm_needed = len(kb_ideas) < n
+    category_hint, classification, retrieval_text = _brainstorm_grounding(issue, category_hint, kb_ideas, llm_needed)
     
     try:
         # Generate ideas with high exploration
-        brainstorm_engine = BrainstormEngine(get_llm_interface())
-        ideas = brainstorm_engine.generate_ideas(issue, n, creativity, category_hint=category_hint, retrieval_text=retrieval_text)
+        ideas = kb_ideas
+        if llm_needed:
+            brainstorm_engine = BrainstormEngine(get_llm_interface())
+            llm_ideas = brainstorm_engine.generate_ideas(issue, n - len(kb_ideas), creativity,
+                                                         category_hint=category_hint, retrieval_text=retrieval_text)
+            ideas = BrainstormEngine._merge_idea_batches([kb_ideas, llm_ideas]) if kb_ideas else llm_ideas
+        now = datetime.now().isoformat()  # one timestamp for the log record and the response
+        idea_dicts = [idea.to_dict() for idea in ideas]  # shared by the log record and the response
         
         # Log the brainstorming session
         _log_llm_run({
             'mode': 'brainstorm',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now,
             'issue': issue,
             'creativity': creativity,
             'ideas_generated': len(ideas),
+            'kb_ideas': len(kb_ideas),
             'server': {
                 'backend': CONFIG['llm_backend'],
                 'model': CONFIG['model']
             },
-            'ideas': [idea.to_dict() for idea in ideas],
+            'ideas': idea_dicts,
             'classification': classification
         })
 
         response = {
-            'ideas': [idea.to_dict() for idea in ideas],
+            'ideas': idea_dicts,
             'meta': {
                 'count': len(ideas),
                 'creativity': creativity,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now,
                 'category_hint': category_hint,
+                'source': 'llm' if not kb_ideas else 'kb+llm' if llm_needed else 'kb',
             }
         }
         
+        parsing_success = len(ideas) > 0 and ideas[0].hypothesis != "Generic troubleshooting approach"
+        if cache_key and parsing_success:
+            _response_cache.set(cache_key, response)
+            _semantic_cache.set(semantic_scope, issue, response)
+        
         # Add debug information if requested
         if debug:
             response['debug'] = {
@@ -1478,8 +1869,8 @@ def api_brainstorm():
                         'template_used': f"brainstorm.{category_hint}.txt" if category_hint else "brainstorm.base.txt",
                         'model': CONFIG['model'],
                         'num_predict': max(512, n * 120),
-                        'temperature': {0: 0.0, 1: 0.3, 2: 0.7, 3: 1.0}.get(creativity, 0.3),
-                        'parsing_success': len(ideas) > 0 and ideas[0].hypothesis != "Generic troubleshooting approach"
+                        'temperature': BrainstormEngine.temperature_for(creativity),
+                        'parsing_success': parsing_success
                     }
                 },
                 'recommendations': []
@@ -1493,36 +1884,91 @@ def api_brainstorm():
             if not response['debug']['steps']['3_brainstorming']['parsing_success']:
                 response['debug']['recommendations'].append("JSON parsing failed - check model output format")
             
-        return jsonify(response)
+        return response, 200
         
     except Exception as e:
-        return jsonify({'error': f'Brainstorming failed: {str(e)}'}), 500
+        return {'error': f'Brainstorming failed: {str(e)}'}, 500
 
-@app.route('/api/ideas/judge', methods=['POST']) 
-def api_judge():
-    """Score and rank ideas using deterministic criteria (temperature=0)."""
-    data = request.get_json()
+@app.route('/api/ideas/brainstorm', methods=['POST'])
+def api_brainstorm():
+    """Generate multiple structured diagnostic ideas (high creativity)."""
+    payload, status = _run_brainstorm(_json_body())
+    return jsonify(payload), status
+
+@app.route('/api/ideas/brainstorm/stream', methods=['POST'])
+def api_brainstorm_stream():
+    """Brainstorm as Server-Sent Events: one {"idea": ...} per idea as it is written, then {"done": true}."""
+    data = _json_body()
+    if 'issue' not in data:
+        return jsonify({'error': 'Missing issue parameter'}), 400
+
+    issue = data['issue']
+    n = data.get('n', 5)
+    creativity = data.get('creativity', 2)
+    if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+        return jsonify({'error': 'n must be a positive integer'}), 400
+    if not isinstance(creativity, int):
+        return jsonify({'error': 'creativity must be an integer'}), 400
+
+    kb_ideas = _kb_ideas(issue)[:n] if _kb_direct_enabled(data) else []
+    llm_needed = len(kb_ideas) < n
+    category_hint, classification, retrieval_text = _brainstorm_grounding(
+        issue, data.get('category_hint'), kb_ideas, llm_needed)
+    engine = BrainstormEngine(get_llm_interface())
+
+    def events():
+        idea_dicts = []  # shared by the events and the log record
+        seen = set()
+        llm_ideas = engine.iter_ideas(issue, n - len(kb_ideas), creativity, category_hint=category_hint,
+                                      retrieval_text=retrieval_text) if llm_needed else ()
+        for idea in itertools.chain(kb_ideas, llm_ideas):
+            key = idea.hypothesis.strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            idea_dicts.append(idea.to_dict())
+            yield f"data: {json_utils.dumps({'idea': idea_dicts[-1]})}\n\n"
+        now = datetime.now().isoformat()
+        meta = {
+            'count': len(idea_dicts),
+            'creativity': creativity,
+            'timestamp': now,
+            'category_hint': category_hint,
+            'source': 'llm' if not kb_ideas else 'kb+llm' if llm_needed else 'kb',
+        }
+        _log_llm_run({
+            'mode': 'brainstorm',
+            'stream': True,
+            'timestamp': now,
+            'issue': issue,
+            'creativity': creativity,
+            'ideas_generated': len(idea_dicts),
+            'kb_ideas': len(kb_ideas),
+            'server': {
+                'backend': CONFIG['llm_backend'],
+                'model': CONFIG['model']
+            },
+            'ideas': idea_dicts,
+            'classification': classification
+        })
+        yield f"data: {json_utils.dumps({'done': True, 'meta': meta})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _run_judge(data: Dict) -> tuple:
+    """Rank data['ideas'] for data['issue']; returns (payload, HTTP status)."""
     
-    if not data or 'ideas' not in data or 'issue' not in data:
-        return jsonify({'error': 'Missing ideas or issue parameter'}), 400
+    if 'ideas' not in data or 'issue' not in data:
+        return {'error': 'Missing ideas or issue parameter'}, 400
     
     issue = data['issue']
     ideas_data = data['ideas']
+    now = datetime.now().isoformat()  # one timestamp for the log record and the response
     
     try:
-        # Convert dict data back to Idea objects
-        ideas = []
-        for idea_dict in ideas_data:
-            idea = Idea(
-                hypothesis=idea_dict.get('hypothesis', ''),
-                category=idea_dict.get('category', 'general'),
-                why=idea_dict.get('why', ''),
-                checks=idea_dict.get('checks', []),
-                fixes=idea_dict.get('fixes', []),
-                risk=idea_dict.get('risk', 'medium')
-            )
-            idea.id = idea_dict.get('id', idea.id)  # Preserve original ID
-            ideas.append(idea)
+        # Convert dict data back to Idea objects (original IDs preserved)
+        ideas = [Idea.from_dict(idea_dict) for idea_dict in ideas_data]
         
         # Judge and rank ideas
         ranked = JudgeEngine.judge_ideas(ideas, issue)
@@ -1530,7 +1976,7 @@ def api_judge():
         # Log the judging session
         _log_llm_run({
             'mode': 'judge',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now,
             'issue': issue,
             'ideas_judged': len(ideas),
             'top_score': ranked[0]['total_score'] if ranked else 0,
@@ -1541,69 +1987,120 @@ def api_judge():
             'ranking': [r['idea']['id'] for r in ranked]
         })
         
-        return jsonify({
+        return {
             'ranked': ranked,
             'rationale': f"Judged {len(ideas)} ideas using safety, success likelihood, cost, and determinism criteria.",
             'meta': {
                 'judged_count': len(ideas),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now
             }
-        })
+        }, 200
         
     except Exception as e:
-        return jsonify({'error': f'Judging failed: {str(e)}'}), 500
+        return {'error': f'Judging failed: {str(e)}'}, 500
 
-@app.route('/api/ideas/probe', methods=['POST'])
-def api_probe():
-    """Run safe diagnostic checks and attach evidence to ideas.""" 
-    data = request.get_json()
+@app.route('/api/ideas/judge', methods=['POST']) 
+def api_judge():
+    """Score and rank ideas using deterministic criteria (temperature=0)."""
+    payload, status = _run_judge(_json_body())
+    return jsonify(payload), status
+
+# Only whitelisted read-only commands are probed (whole words, so 'dig' does not match 'digest')
+_PROBE_SAFE_COMMANDS = ('nmcli', 'ip addr', 'ip route', 'rfkill list',
+                        'systemctl status', 'journalctl', 'dig', 'nslookup')
+# Case-insensitive substring match, one pass over the check
+_PROBE_SAFE_RE = re.compile('|'.join(map(re.escape, _PROBE_SAFE_COMMANDS)), re.IGNORECASE)
+
+def _run_probe_check(check: str) -> Optional[Dict]:
+    """Run one whitelisted check if it analyzes as low risk; returns evidence or None."""
+    try:
+        # Execute safe read-only command
+        analysis = CommandExecutor.analyze_command(check)
+        if analysis['risk_level'] != 'low':
+            return None
+        return _run_capped(check)
+    except Exception as e:
+        return {'error': str(e)}
+
+def _run_capped(check: str, max_stdout: int = 500, max_stderr: int = 200, timeout: float = 5) -> Dict:
+    """Run a shell check keeping only the head of its output.
+
+    Output past max_stdout bytes is read and discarded rather than buffered, so verbose
+    commands (journalctl) still exit normally and report their real status; only a check
+    that outlives the timeout is killed. stderr goes to a temp file so neither pipe can stall.
+    """
+    with tempfile.TemporaryFile() as err, subprocess.Popen(
+            check, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=err,
+            cwd='/', env={**os.environ, 'LC_ALL': 'C'}, start_new_session=True) as proc:
+        expired = threading.Event()
+        def _expire():
+            expired.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        timer = threading.Timer(timeout, _expire)
+        timer.start()
+        try:
+            out = proc.stdout.read(max_stdout)
+            truncated = False
+            while proc.stdout.read(65536):
+                truncated = True
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+        if expired.is_set():
+            raise subprocess.TimeoutExpired(check, timeout)
+        err.seek(0)
+        evidence = {
+            'stdout': out.decode('utf-8', errors='replace'),
+            'stderr': err.read(max_stderr).decode('utf-8', errors='replace'),
+            'returncode': returncode
+        }
+        if truncated:
+            evidence['truncated'] = True
+        return evidence
+
+def _run_probe(data: Dict) -> tuple:
+    """Attach whitelisted check evidence to data['ideas']; returns (payload, HTTP status)."""
     
-    if not data or 'ideas' not in data:
-        return jsonify({'error': 'Missing ideas parameter'}), 400
+    if 'ideas' not in data:
+        return {'error': 'Missing ideas parameter'}, 400
     
     ideas_data = data['ideas']
     run_checks = data.get('run_checks', True)
     
     try:
         probed_ideas = []
+        pending = []  # (evidence dict, check, future) - checks run concurrently on the I/O pool
+        futures = {}  # check -> future; a check shared by several ideas runs once
+        pool = _io_pool()
         
         for idea_dict in ideas_data:
             idea = idea_dict.copy()
             
             if run_checks and 'checks' in idea:
                 evidence = {}
-                
-                # Only run whitelisted read-only commands
-                safe_commands = ['nmcli', 'ip addr', 'ip route', 'rfkill list', 
-                               'systemctl status', 'journalctl', 'dig', 'nslookup']
-                
                 for check in idea['checks'][:3]:  # Limit to first 3 checks
-                    if any(cmd in check.lower() for cmd in safe_commands):
-                        try:
-                            # Execute safe read-only command
-                            analysis = CommandExecutor.analyze_command(check)
-                            if analysis['risk_level'] == 'low':
-                                result = subprocess.run(
-                                    check, shell=True, 
-                                    capture_output=True, text=True, 
-                                    timeout=5
-                                )
-                                evidence[check] = {
-                                    'stdout': result.stdout[:500],  # Truncate
-                                    'stderr': result.stderr[:200],
-                                    'returncode': result.returncode
-                                }
-                        except Exception as e:
-                            evidence[check] = {'error': str(e)}
-                
+                    future = futures.get(check)
+                    if future is None and _PROBE_SAFE_RE.search(check):
+                        future = futures[check] = pool.submit(_run_probe_check, check)
+                    if future is not None:
+                        pending.append((evidence, check, future))
                 idea['evidence'] = evidence
             
             probed_ideas.append(idea)
         
+        for evidence, check, future in pending:
+            result = future.result()
+            if result is not None:
+                evidence[check] = result
+        now = datetime.now().isoformat()  # one timestamp for the log record and the response
+        
         # Log the probing session
         _log_llm_run({
             'mode': 'probe',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now,
             'ideas_probed': len(probed_ideas),
             'checks_run': run_checks,
             'server': {
@@ -1612,17 +2109,49 @@ def api_probe():
             }
         })
         
-        return jsonify({
+        return {
             'probed_ideas': probed_ideas,
             'meta': {
                 'probed_count': len(probed_ideas),
                 'checks_executed': run_checks,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now
             }
-        })
+        }, 200
         
     except Exception as e:
-        return jsonify({'error': f'Probing failed: {str(e)}'}), 500
+        return {'error': f'Probing failed: {str(e)}'}, 500
+
+@app.route('/api/ideas/probe', methods=['POST'])
+def api_probe():
+    """Run safe diagnostic checks and attach evidence to ideas."""
+    payload, status = _run_probe(_json_body())
+    return jsonify(payload), status
+
+@app.route('/api/session', methods=['POST'])
+def api_session():
+    """Brainstorm, probe and judge an issue in one round trip."""
+    data = _json_body()
+    ideas, status = _run_brainstorm(data)
+    if status != 200:
+        return jsonify(ideas), status
+    probed, status = _run_probe({'ideas': ideas['ideas'], 'run_checks': data.get('run_checks', True)})
+    if status != 200:
+        return jsonify(probed), status
+    judged, status = _run_judge({'issue': data['issue'], 'ideas': probed['probed_ideas']})
+    if status != 200:
+        return jsonify(judged), status
+
+    session = {
+        'issue': data['issue'],
+        'ideas': ideas['ideas'],
+        'probed_ideas': probed['probed_ideas'],
+        'ranked': judged['ranked'],
+        'rationale': judged['rationale'],
+        'meta': {'brainstorm': ideas['meta'], 'probe': probed['meta'], 'judge': judged['meta']},
+    }
+    if 'debug' in ideas:
+        session['debug'] = ideas['debug']
+    return jsonify(session)
 
 
 # =====================================================================
@@ -1647,8 +2176,7 @@ def start_llm_backend():
     if CONFIG['llm_backend'] == 'ollama':
         # Check if Ollama is running
         try:
-            import requests
-            requests.get('http://localhost:11434/api/tags')
+            _ollama_get('/api/tags', timeout=1)
             print("✓ Ollama is running")
         except:
             print("Starting Ollama...")
@@ -1717,7 +2245,7 @@ def api_bundle_scan_storage():
 @app.route('/api/bundle/create', methods=['POST'])
 def api_bundle_create():
     """Create a bundle on specified storage device"""
-    data = request.get_json() or {}
+    data = _json_body()
     target_path = data.get('target_path')
     include_models = data.get('include_models', False)
     include_deps = data.get('include_deps', True)  # Default to offline mode
@@ -1741,7 +2269,6 @@ def api_bundle_create():
         cmd.append(target_path)
         
         # Start bundle creation in background
-        import threading
         bundle_status = {'status': 'starting', 'progress': 0, 'message': 'Initializing bundle creation...'}
         
         def run_bundle_creation():
@@ -1808,21 +2335,21 @@ if __name__ == '__main__':
     
     # Setup steps
     start_llm_backend()
+    if os.getenv('RN_PREWARM', '1').lower() in ('1', 'true', 'yes', 'on'):
+        # Load the model in the background so the first request skips the cold start
+        threading.Thread(target=get_llm_interface().warm_up, daemon=True).start()
     print_connection_guidance()
     
-    # Get local IP for display
-    hostname = socket.gethostname()
-    try:
-        local_ip = socket.gethostbyname(hostname)
-    except:
-        local_ip = '127.0.0.1'
+    # Get local IPs for display from one `ip addr` parse (no resolver lookup of the hostname,
+    # which can hang on a misconfigured /etc/hosts)
+    ips = SystemDiagnostics.ipv4_addresses()
+    local_ip = ips[0] if ips else '127.0.0.1'
     
     print(f"\n✓ Server starting:")
     bind = CONFIG['bind_host']
     if bind == '0.0.0.0':
         print(f"  • http://localhost:{CONFIG['port']}")
         print(f"  • http://{local_ip}:{CONFIG['port']}")
-        ips = SystemDiagnostics.ipv4_addresses()
         if ips:
             print("  • Local IPv4s:")
             for ip in ips:
@@ -1833,9 +2360,19 @@ if __name__ == '__main__':
     print(f"✓ LLM backend: {CONFIG['llm_backend']}")
     print("\nPress Ctrl+C to stop\n")
     
-    # Start server
-    app.run(
-        host=CONFIG['bind_host'],  # Bind host
-        port=CONFIG['port'],
-        debug=False  # Set True for development
-    )
+    # Start server: waitress (HTTP/1.1 keep-alive, bounded thread pool) when installed,
+    # otherwise the Werkzeug server. RN_WSGI=werkzeug forces the latter.
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+    if serve is not None and os.getenv('RN_WSGI', 'waitress').lower() != 'werkzeug':
+        serve(app, host=CONFIG['bind_host'], port=CONFIG['port'],
+              threads=int(os.getenv('RN_WSGI_THREADS', '16')), connection_limit=1000)
+    else:
+        app.run(
+            host=CONFIG['bind_host'],  # Bind host
+            port=CONFIG['port'],
+            threaded=True,  # One thread per request; slow LLM calls don't block status/probe
+            debug=False  # Set True for development
+        )
@@ -19,4 +19,11 @@ fi
 
 # Run the server
 echo "Starting RoadNerd Server..."
+# RN_GUNICORN=1 serves the app under gunicorn instead. Keep a single worker process:
+# diagnose jobs, caches and the run-log writer live in memory; concurrency comes from
+# threads (or RN_GUNICORN_WORKER=gevent when gevent is installed).
+if [ "${RN_GUNICORN:-0}" = "1" ] && command -v gunicorn > /dev/null; then
+    exec gunicorn -k "${RN_GUNICORN_WORKER:-gthread}" -w 1 --threads "${RN_WSGI_THREADS:-16}" \
+        --timeout 180 --bind "${RN_BIND:-${RN_BIND_HOST:-0.0.0.0}}:${RN_PORT:-8080}" roadnerd_server:app
+fi
 python3 roadnerd_server.py
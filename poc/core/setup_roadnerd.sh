@@ -77,6 +77,7 @@ pip install --upgrade pip
 # Install Python packages
 echo "Installing Python packages..."
 pip install flask flask-cors requests
+pip install waitress || echo "waitress not installed; the server will use Flask's built-in server"
 
 # Step 3: Install Ollama (if not present)
 echo ""
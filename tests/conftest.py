@@ -4,6 +4,14 @@ from pathlib import Path
 import pytest
 
 
+@pytest.fixture(autouse=True, scope='session')
+def _isolated_run_logs(tmp_path_factory):
+    # Endpoints append run records via _log_llm_run; keep them out of the repo's logs/llm_runs
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('RN_LOG_DIR', str(tmp_path_factory.mktemp('llm_runs')))
+        yield
+
+
 @pytest.fixture()
 def template_client():
     # Load the Flask app from the script file without relying on package layout
@@ -11,6 +11,7 @@ def test_status_and_api_docs(flask_client):
     assert data['server'] == 'online'
     assert 'system' in data and 'connectivity' in data
     assert 'ips' in data['system']
+    assert set(data['cache']) == set(data['llm_cache']) == {'size', 'hits', 'misses'}
 
     r2 = flask_client.get('/')
     assert r2.status_code == 200
@@ -39,11 +40,13 @@ def test_diagnose_logs_and_returns(flask_client, monkeypatch, tmp_path):
 
     # Patch Path(__file__).resolve().parents[2] inside helper by monkeypatching Path.resolve? Hard; patch helper itself
     # Instead, call diagnose and then verify response structure; logging is best-effort anyway.
+    monkeypatch.setenv('RN_LOG_DIR', str(logs_dir))
     r = flask_client.post('/api/diagnose', json={'issue': 'DNS is failing'})
     assert r.status_code == 200
     data = r.get_json()
     assert 'llm_suggestion' in data
     assert 'system_context' in data and 'connectivity' in data
+    assert data['issue_digest'] == srv._issue_digest('DNS is failing') and len(data['issue_digest']) == 16
 
 
 @pytest.mark.integration
@@ -61,3 +64,260 @@ def test_execute_safe_mode(flask_client, monkeypatch):
     # Executed may be True or False depending on environment; ensure output is present
     assert 'output' in result2
 
+
+
+@pytest.mark.integration
+def test_diagnose_async_job(flask_client, monkeypatch, tmp_path):
+    import time
+
+    monkeypatch.setenv('RN_LOG_DIR', str(tmp_path))
+    r = flask_client.post('/api/diagnose', json={'issue': 'DNS is failing', 'async': True})
+    assert r.status_code == 202
+    job_id = r.get_json()['job_id']
+
+    job = {}
+    for _ in range(100):
+        job = flask_client.get(f'/api/diagnose/{job_id}').get_json()
+        if job['status'] in ('completed', 'failed'):
+            break
+        time.sleep(0.05)
+    assert job['status'] == 'completed'
+    assert 'llm_suggestion' in job['result']
+
+    assert flask_client.get('/api/diagnose/does-not-exist').status_code == 404
+
+
+@pytest.mark.integration
+def test_diagnose_kb_hit_skips_llm(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    class NoLLM:
+        def get_response(self, prompt, **kw):
+            raise AssertionError('LLM should not be called on a KB hit')
+
+    monkeypatch.setattr(srv, 'llm_interface', NoLLM())
+    r = flask_client.post('/api/diagnose', json={'issue': 'Disk full, no space left on device'})
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data['source'] == 'kb'
+    assert data['kb_solution']['name'] in data['llm_suggestion']
+
+
+@pytest.mark.integration
+def test_scan_network_sections(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+
+    def fake_run(cmd, capture_output=False, text=False):
+        if cmd[:2] == ['ip', 'route']:
+            raise OSError('ip missing')
+        return SimpleNamespace(stdout='out:' + ' '.join(cmd), stderr='', returncode=0)
+
+    monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    srv._scan_cache.clear()
+    r = flask_client.get('/api/scan_network')
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data['interfaces'] == 'out:ip addr'
+    assert data['routes'] == 'Could not get routes'
+    assert 'dns_config' in data
+
+
+@pytest.mark.integration
+def test_scan_network_reuses_recent_output(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+    calls = []
+
+    def fake_run(cmd, capture_output=False, text=False):
+        calls.append(cmd)
+        return SimpleNamespace(stdout='out', stderr='', returncode=0)
+
+    monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    srv._scan_cache.clear()
+    flask_client.get('/api/scan_network')
+    flask_client.get('/api/scan_network')
+    assert len(calls) == 2  # ip addr + ip route once; the second scan hit the cache
+
+
+@pytest.mark.integration
+def test_llm_run_log_written_in_background(flask_client, monkeypatch, tmp_path):
+    import json
+    import roadnerd_server as srv
+    monkeypatch.setenv('RN_LOG_DIR', str(tmp_path))
+
+    srv._log_llm_run({'mode': 'test', 'n': 1})
+    srv._log_llm_run({'mode': 'test', 'n': 2})
+    srv._llm_log_queue.join()
+
+    lines = next(tmp_path.glob('*.jsonl')).read_text().splitlines()
+    assert [json.loads(l)['n'] for l in lines] == [1, 2]
+
+
+@pytest.mark.integration
+def test_execute_blank_and_repeated_reads(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+    calls = []
+
+    def fake_run(cmd, shell=False, capture_output=False, text=False, timeout=None):
+        calls.append(cmd)
+        return SimpleNamespace(stdout='up 1 day', stderr='', returncode=0)
+
+    monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    srv._exec_cache.clear()
+    assert flask_client.post('/api/execute', json={'command': '   '}).status_code == 400
+
+    for _ in range(2):
+        assert flask_client.post('/api/execute', json={'command': 'uptime'}).get_json()['output'] == 'up 1 day'
+    flask_client.post('/api/execute', json={'command': 'uptime; touch /tmp/x'})
+    assert calls == ['uptime', 'uptime; touch /tmp/x']
+
+    # Mutating ip forms are never served from cache
+    calls.clear()
+    for command in ('ip link set dev wlan0 down', 'ip route del default', 'ip -4 addr show', 'ip -4 addr show'):
+        flask_client.post('/api/execute', json={'command': command})
+    assert calls == ['ip link set dev wlan0 down', 'ip route del default', 'ip -4 addr show']
+    calls.clear()
+    for command in ('ip link set dev wlan0 down', 'ip route del default'):
+        flask_client.post('/api/execute', json={'command': command})
+    assert calls == ['ip link set dev wlan0 down', 'ip route del default']
+    srv._exec_cache.clear()
+
+
+@pytest.mark.integration
+def test_classifier_and_retriever_built_once(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    built = []
+    real = srv._ret.HybridRetriever
+    monkeypatch.setattr(srv._ret, 'HybridRetriever', lambda: built.append(1) or real())
+    srv._retriever.cache_clear()
+    srv._retrieval_cache.clear()
+    for issue in ('laptop fan is loud', 'laptop fan is quiet'):
+        assert flask_client.post('/api/diagnose', json={'issue': issue}).status_code == 200
+    assert built == [1]
+    assert srv._classifier() is srv._classifier()
+    srv._retriever.cache_clear()
+
+
+@pytest.mark.integration
+def test_retrieval_reused_across_diagnose_and_brainstorm(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    searches = []
+
+    class Retriever:
+        def search(self, issue, category_hint=None, k=3):
+            searches.append((issue, category_hint, k))
+            return []
+
+    monkeypatch.setattr(srv, '_retriever', lambda: Retriever())
+    srv._retrieval_cache.clear()
+    issue = 'printer jams on every page'
+    flask_client.post('/api/diagnose', json={'issue': issue})
+    label = searches[0][1]
+    flask_client.post('/api/ideas/brainstorm', json={'issue': issue, 'n': 1, 'category_hint': label})
+    assert searches == [(issue, label, 3)]
+    srv._retrieval_cache.clear()
+
+
+@pytest.mark.integration
+def test_downloads_are_conditional(flask_client, monkeypatch, tmp_path):
+    r = flask_client.get('/download/client.py')
+    assert r.status_code == 200 and r.headers.get('Accept-Ranges') == 'bytes'
+    assert flask_client.get('/download/client.py', headers={'If-None-Match': r.headers['ETag']}).status_code == 304
+
+    models = tmp_path / '.roadnerd' / 'models'
+    models.mkdir(parents=True)
+    (models / 'ollama-models.tar.gz').write_bytes(b'0123456789')
+    monkeypatch.setattr(Path, 'home', staticmethod(lambda: tmp_path))
+    r = flask_client.get('/download/ollama-models.tar.gz')
+    assert r.status_code == 200 and 'max-age=86400' in r.headers['Cache-Control']
+    partial = flask_client.get('/download/ollama-models.tar.gz', headers={'Range': 'bytes=4-'})
+    assert partial.status_code == 206 and partial.data == b'456789'
+
+    monkeypatch.setitem(flask_client.application.config, 'USE_X_SENDFILE', True)
+    r = flask_client.get('/download/ollama-models.tar.gz')
+    assert r.headers['X-Sendfile'] == str(models / 'ollama-models.tar.gz') and r.data == b''
+
+
+@pytest.mark.integration
+def test_llm_stream_sends_server_sent_events(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    class StreamingLLM:
+        def stream_response(self, prompt, **kw):
+            yield from ('Check ', 'resolv.conf')
+
+    monkeypatch.setattr(srv, 'llm_interface', StreamingLLM())
+    r = flask_client.post('/api/llm/stream', json={'prompt': 'dns?'})
+    assert r.status_code == 200 and r.mimetype == 'text/event-stream'
+    events = [json.loads(line[len('data: '):]) for line in r.get_data(as_text=True).split('\n\n') if line]
+    assert [e.get('response') for e in events[:-1]] == ['Check ', 'resolv.conf']
+    assert events[-1]['done'] is True
+    assert flask_client.post('/api/llm/stream', json={}).status_code == 400
+
+
+@pytest.mark.integration
+def test_model_list_reuses_recent_ollama_tags(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+
+    calls = []
+
+    def fake_get(path, timeout=5):
+        calls.append(path)
+        return SimpleNamespace(status_code=200, json=lambda: {'models': [{'name': 'llama3.2:3b'}]})
+
+    monkeypatch.setattr(srv, '_ollama_get', fake_get)
+    srv._tags_cache.clear()
+    for _ in range(3):
+        names = [m['name'] for m in flask_client.get('/api/model/list').get_json()['available_models']]
+        assert names == ['llama3.2:3b']
+    assert calls == ['/api/tags']
+    srv._tags_cache.clear()
+
+
+@pytest.mark.integration
+def test_profile_standard_samples_cpu_without_sleeping(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+
+    intervals = []
+
+    def cpu_percent(interval=None):
+        intervals.append(interval)
+        return 42.0
+
+    monkeypatch.setattr(srv, 'psutil', SimpleNamespace(
+        cpu_percent=cpu_percent, virtual_memory=lambda: SimpleNamespace(percent=50.0, used=2 * 1024**3)))
+    monkeypatch.setattr(srv, '_run_brainstorm', lambda payload: ({'ideas': [{}] * 5}, 200))
+    monkeypatch.setattr(srv, '_ollama_models', lambda: [])
+    r = flask_client.post('/api/profile/standard')
+    assert r.status_code == 200
+    assert r.get_json()['performance_metrics']['cpu_usage_percent'] == 42.0
+    assert intervals == [None, None]
+
+
+@pytest.mark.integration
+def test_profile_standard_can_go_over_http(flask_client, monkeypatch):
+    import roadnerd_server as srv
+    from types import SimpleNamespace
+
+    posted = []
+
+    def post(url, **kw):
+        posted.append(url)
+        return SimpleNamespace(status_code=200, content=b'{"ideas": [{}, {}, {}]}')
+
+    monkeypatch.setenv('RN_PROFILE_OVER_HTTP', '1')
+    monkeypatch.setitem(srv.CONFIG, 'bind_host', '0.0.0.0')
+    monkeypatch.setattr(srv, 'get_http_session', lambda: SimpleNamespace(post=post))
+    monkeypatch.setattr(srv, '_run_brainstorm', lambda payload: pytest.fail('should not run in-process'))
+    monkeypatch.setattr(srv, '_ollama_models', lambda: [])
+    monkeypatch.setattr(srv, 'psutil', SimpleNamespace(
+        cpu_percent=lambda interval=None: 0.0, virtual_memory=lambda: SimpleNamespace(percent=50.0, used=0)))
+    r = flask_client.post('/api/profile/standard')
+    assert r.status_code == 200 and r.get_json()['analysis']['ideas_generated'] == 3
+    assert posted == [f"http://127.0.0.1:{srv.CONFIG['port']}/api/ideas/brainstorm"]
@@ -1,5 +1,7 @@
 import json
-from types import SimpleNamespace
+import subprocess
+
+import pytest
 
 
 def stub_llm_response_array():
@@ -42,7 +44,8 @@ def test_brainstorm_parses_fenced_json(mock_llm_client):
 ```
 """
     client = mock_llm_client(lambda: fenced)
-    r = client.post('/api/ideas/brainstorm', json={'issue': 'wifi down', 'n': 3, 'creativity': 3})
+    # 'wifi down' is a KB symptom; opt out so the model output is what gets parsed
+    r = client.post('/api/ideas/brainstorm', json={'issue': 'wifi down', 'n': 3, 'creativity': 3, 'kb_direct': False})
     assert r.status_code == 200
     ideas = r.get_json()['ideas']
     assert len(ideas) == 1
@@ -52,11 +55,11 @@ def test_brainstorm_parses_fenced_json(mock_llm_client):
 def test_probe_whitelist_and_limits(flask_client, monkeypatch):
     import roadnerd_server as srv
 
-    # Fake subprocess.run to avoid real commands
-    def fake_run(cmd, shell=False, capture_output=False, text=False, timeout=None):
-        return SimpleNamespace(stdout=f"out:{cmd}", stderr="", returncode=0)
+    # Fake the capped runner to avoid real commands
+    def fake_run_capped(check):
+        return {'stdout': f"out:{check}", 'stderr': '', 'returncode': 0}
 
-    monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    monkeypatch.setattr(srv, '_run_capped', fake_run_capped)
     payload = {
         'ideas': [{
             'hypothesis': 'test', 'category': 'dns', 'why': 'x',
@@ -88,3 +91,155 @@ def test_judge_succeeds(flask_client):
     # Top idea should be safer one typically
     assert ranked[0]['idea']['risk'] in ('low', 'medium')
 
+
+
+def test_probe_evidence_stays_with_its_idea(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    runs = []
+
+    def fake_run_capped(check):
+        runs.append(check)
+        return {'stdout': f"out:{check}", 'stderr': '', 'returncode': 0}
+
+    monkeypatch.setattr(srv, '_run_capped', fake_run_capped)
+    payload = {'ideas': [
+        {'hypothesis': 'a', 'checks': ['ip addr', 'dig example.com']},
+        {'hypothesis': 'b', 'checks': ['ip route', 'rm -rf / ; dig x']},
+        {'hypothesis': 'c'},
+        {'hypothesis': 'd', 'checks': ['sha256sum digest.txt', 'IP ADDR show', 'ip address show']},
+        {'hypothesis': 'e', 'checks': ['dig example.com', 'ip addr']},
+    ]}
+    r = flask_client.post('/api/ideas/probe', json=payload)
+    assert r.status_code == 200
+    probed = r.get_json()['probed_ideas']
+    assert set(probed[0]['evidence']) == {'ip addr', 'dig example.com'}
+    assert probed[0]['evidence']['dig example.com']['stdout'] == 'out:dig example.com'
+    assert set(probed[1]['evidence']) == {'ip route'}
+    assert 'evidence' not in probed[2]
+    # case-insensitive substring whitelist, as the original any(cmd in check.lower()) test
+    assert set(probed[3]['evidence']) == {'sha256sum digest.txt', 'IP ADDR show', 'ip address show'}
+    assert probed[4]['evidence'] == probed[0]['evidence']
+    assert runs.count('ip addr') == 1  # repeated across ideas, executed once
+
+
+def test_probe_output_is_capped_and_keeps_exit_status():
+    import roadnerd_server as srv
+    ev = srv._run_capped('seq 1 2000', max_stdout=100)
+    assert len(ev['stdout']) == 100 and ev['truncated'] is True
+    assert ev['returncode'] == 0  # discarded output does not turn a passing check into a kill
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        srv._run_capped('yes', max_stdout=100, timeout=0.2)
+
+    ev = srv._run_capped('echo hi; echo oops >&2; exit 3')
+    assert ev == {'stdout': 'hi\n', 'stderr': 'oops\n', 'returncode': 3}
+
+
+def test_brainstorm_low_creativity_is_cached(mock_llm_client):
+    import roadnerd_server as srv
+    srv._response_cache.clear()
+    calls = []
+
+    def counting():
+        calls.append(1)
+        return stub_llm_response_array()
+
+    client = mock_llm_client(counting)
+    body = {'issue': 'DNS failing again', 'n': 2, 'creativity': 1}
+    first = client.post('/api/ideas/brainstorm', json=body).get_json()
+    second = client.post('/api/ideas/brainstorm', json=body).get_json()
+    client.post('/api/ideas/brainstorm', json={**body, 'creativity': 3})
+
+    assert len(calls) == 2  # the repeat was served from cache, creativity 3 was not
+    assert second['meta']['cached'] is True
+    assert second['ideas'] == first['ideas']
+    srv._response_cache.clear()
+
+
+def test_malformed_or_missing_json_is_a_clean_400(flask_client):
+    bad = flask_client.post('/api/ideas/brainstorm', data='{not json', content_type='application/json')
+    assert bad.status_code == 400 and bad.get_json() == {'error': 'Missing issue parameter'}
+    assert flask_client.post('/api/ideas/judge', data='issue=x').status_code == 400
+    assert flask_client.post('/api/ideas/probe', json=['ideas']).status_code == 400
+
+
+def test_brainstorm_kb_hit_tops_up_from_llm(mock_llm_client):
+    calls = []
+
+    def counting():
+        calls.append(1)
+        return stub_llm_response_array()
+
+    client = mock_llm_client(counting)
+    only_kb = client.post('/api/ideas/brainstorm', json={'issue': 'cannot resolve hosts', 'n': 2, 'creativity': 3}).get_json()
+    assert calls == [] and only_kb['meta']['source'] == 'kb'
+    assert only_kb['ideas'][0]['hypothesis'] == 'Restart systemd-resolved'
+
+    mixed = client.post('/api/ideas/brainstorm', json={'issue': 'cannot resolve hosts', 'n': 4, 'creativity': 3}).get_json()
+    assert calls == [1] and mixed['meta']['source'] == 'kb+llm'
+    assert [i['hypothesis'] for i in mixed['ideas']][1:3] == ['Set Google DNS', 'DNS misconfiguration']
+
+    client.post('/api/ideas/brainstorm', json={'issue': 'cannot resolve hosts', 'n': 2, 'creativity': 3, 'kb_direct': False})
+    assert calls == [1, 1]
+
+
+def test_session_runs_brainstorm_probe_and_judge(mock_llm_client, monkeypatch):
+    import roadnerd_server as srv
+
+    monkeypatch.setattr(srv, '_run_capped', lambda check: {'stdout': f"out:{check}", 'stderr': '', 'returncode': 0})
+    client = mock_llm_client(stub_llm_response_array)
+    r = client.post('/api/session', json={'issue': 'DNS failing', 'n': 2, 'creativity': 3})
+    assert r.status_code == 200
+    data = r.get_json()
+    assert len(data['ideas']) == 2
+    assert data['probed_ideas'][1]['evidence']['nmcli dev status']['stdout'] == 'out:nmcli dev status'
+    assert {x['idea']['id'] for x in data['ranked']} == {i['id'] for i in data['ideas']}
+    assert set(data['meta']) == {'brainstorm', 'probe', 'judge'}
+
+    assert client.post('/api/session', json={'n': 2}).status_code == 400
+
+
+def test_brainstorm_stream_sends_kb_then_llm_ideas(flask_client, monkeypatch):
+    import roadnerd_server as srv
+
+    class StreamingLLM:
+        def stream_response(self, prompt, **kw):
+            text = stub_llm_response_array()
+            yield from (text[:len(text) // 2], text[len(text) // 2:])
+
+    monkeypatch.setattr(srv, 'llm_interface', StreamingLLM())
+    r = flask_client.post('/api/ideas/brainstorm/stream', json={'issue': 'cannot resolve hosts', 'n': 4, 'creativity': 3})
+    assert r.status_code == 200 and r.mimetype == 'text/event-stream'
+    events = [json.loads(chunk[len('data: '):]) for chunk in r.get_data(as_text=True).split('\n\n') if chunk]
+    assert [e['idea']['hypothesis'] for e in events[:-1]] == [
+        'Restart systemd-resolved', 'Set Google DNS', 'DNS misconfiguration', 'NetworkManager glitch']
+    assert events[-1]['done'] is True and events[-1]['meta']['source'] == 'kb+llm'
+    assert flask_client.post('/api/ideas/brainstorm/stream', json={'n': 2}).status_code == 400
+
+
+def test_brainstorm_rejects_non_positive_n(mock_llm_client):
+    client = mock_llm_client(stub_llm_response_array)
+    for n in (0, -1, 'five', True):
+        for path in ('/api/ideas/brainstorm', '/api/ideas/brainstorm/stream', '/api/session'):
+            r = client.post(path, json={'issue': 'my wifi is weird', 'n': n, 'kb_direct': False})
+            assert r.status_code == 400 and r.get_json() == {'error': 'n must be a positive integer'}
+
+
+def test_brainstorm_cache_respects_kb_direct(mock_llm_client):
+    import roadnerd_server as srv
+    srv._response_cache.clear()
+    calls = []
+
+    def counting():
+        calls.append(1)
+        return stub_llm_response_array()
+
+    client = mock_llm_client(counting)
+    body = {'issue': 'dns not working cannot resolve', 'n': 1, 'creativity': 0}
+    kb = client.post('/api/ideas/brainstorm', json=body).get_json()
+    assert kb['meta']['source'] == 'kb' and calls == []
+
+    llm = client.post('/api/ideas/brainstorm', json={**body, 'kb_direct': False}).get_json()
+    assert llm['meta']['source'] == 'llm' and 'cached' not in llm['meta'] and calls == [1]
+    srv._response_cache.clear()
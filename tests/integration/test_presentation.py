@@ -17,3 +17,11 @@ def test_api_docs_uses_external_js(template_client):
     r = template_client.get('/api-docs')
     assert r.status_code == 200
     assert b'/static/js/api-console.js' in r.data or b'api-console.js' in r.data
+
+def test_pages_are_cached_and_revalidated(template_client):
+    r = template_client.get('/api-docs')
+    assert 'max-age' in r.headers.get('Cache-Control', '')
+    etag = r.headers.get('ETag')
+    assert etag
+    again = template_client.get('/api-docs', headers={'If-None-Match': etag})
+    assert again.status_code == 304
@@ -293,6 +293,80 @@ This should help identify the performance issue.'''
             call_kwargs = mock_llm.get_response.call_args[1]
             assert call_kwargs['num_predict'] == 1200
 
+    def test_split_brainstorm_fans_out_and_dedupes(self, monkeypatch):
+        """RN_BRAINSTORM_SPLIT issues concurrent sub-prompts and merges unique ideas"""
+        monkeypatch.setenv('RN_BRAINSTORM_SPLIT', '2')
+
+        def respond(prompt, **kwargs):
+            return json.dumps([
+                {"hypothesis": "Shared cause", "category": "dns", "why": "x"},
+                {"hypothesis": f"Cause for {prompt}", "category": "dns", "why": "x"},
+            ])
+
+        with patch('modules.system_diagnostics.SystemDiagnostics.get_system_info', return_value={}), \
+             patch('modules.system_diagnostics.SystemDiagnostics.check_connectivity', return_value={}), \
+             patch('modules.brainstorm_engine.TemplateLoader.load_template', return_value='{{N}} ideas'):
+            mock_llm = MagicMock(spec=LLMInterface)
+            mock_llm.get_response.side_effect = respond
+            ideas = BrainstormEngine(mock_llm).generate_ideas("DNS broken", n=5)
+
+        assert mock_llm.get_response.call_count == 3  # 2 + 2 + 1 ideas
+        prompts = sorted(c.args[0] for c in mock_llm.get_response.call_args_list)
+        assert prompts == ['1 ideas', '2 ideas', '2 ideas']
+        hypotheses = [i.hypothesis for i in ideas]
+        assert sorted(hypotheses) == ["Cause for 1 ideas", "Cause for 2 ideas", "Shared cause"]
+
+    def test_stream_stops_once_enough_ideas_parse(self):
+        """generate_ideas passes a stop predicate that fires when n ideas are complete"""
+        with patch('modules.system_diagnostics.SystemDiagnostics.get_system_info', return_value={}), \
+             patch('modules.system_diagnostics.SystemDiagnostics.check_connectivity', return_value={}), \
+             patch('modules.brainstorm_engine.TemplateLoader.load_template', return_value='{{N}} ideas'):
+            mock_llm = MagicMock(spec=LLMInterface)
+            mock_llm.get_response.return_value = '[]'
+            BrainstormEngine(mock_llm).generate_ideas("DNS broken", n=2)
+
+        stop = mock_llm.get_response.call_args[1]['stop']
+        one = '[{"hypothesis": "A", "checks": ["dig"]}'
+        two = one + ', {"hypothesis": "B", "checks": ["ip r"]}'
+        assert not stop(one)
+        assert not stop(two[:-1])  # second object still open
+        assert stop(two)
+        # A closed nested object inside a still-open idea is not an idea
+        assert not BrainstormEngine._has_ideas('[{"hypothesis": "A", "evidence": {"k": 1}', 1)
+        assert BrainstormEngine._has_ideas('[{"hypothesis": "A", "evidence": {"k": 1}}', 1)
+
+    def test_iter_ideas_yields_each_idea_as_it_completes(self):
+        """iter_ideas emits ideas mid-stream, including inside an open wrapper, and closes the stream at n"""
+        pieces = ['{"ideas": [{"hypothesis": "A", "checks": ["dig"]}', ', {"hypothesis": "B",',
+                  ' "fixes": []}', ', {"hypothesis": "C"}]}']
+        seen = []
+
+        def chunks():
+            for piece in pieces:
+                seen.append(piece)
+                yield piece
+
+        with patch('modules.system_diagnostics.SystemDiagnostics.get_system_info', return_value={}), \
+             patch('modules.system_diagnostics.SystemDiagnostics.check_connectivity', return_value={}), \
+             patch('modules.brainstorm_engine.TemplateLoader.load_template', return_value='{{N}} ideas'):
+            mock_llm = MagicMock(spec=LLMInterface)
+            mock_llm.stream_response.return_value = chunks()
+            stream = BrainstormEngine(mock_llm).iter_ideas("DNS broken", n=2)
+            assert next(stream).hypothesis == 'A' and len(seen) == 1
+            assert [i.hypothesis for i in stream] == ['B']
+
+        assert len(seen) == 3  # the third idea was never generated
+        assert mock_llm.stream_response.call_args[0][0] == '2 ideas'
+
+    def test_iter_ideas_falls_back_to_whole_reply(self):
+        """Replies without streamable idea objects are parsed once at the end"""
+        with patch('modules.system_diagnostics.SystemDiagnostics.get_system_info', return_value={}), \
+             patch('modules.system_diagnostics.SystemDiagnostics.check_connectivity', return_value={}):
+            mock_llm = MagicMock(spec=LLMInterface)
+            mock_llm.stream_response.return_value = (piece for piece in ['Ollama not available: refused'])
+            ideas = list(BrainstormEngine(mock_llm).iter_ideas("DNS broken", n=3))
+        assert [i.hypothesis for i in ideas] == ["Generic troubleshooting approach"]
+
     def test_balanced_brace_parsing(self):
         """Test balanced brace JSON extraction from mixed text"""
         # Mock response with JSON objects mixed in narrative text
@@ -320,6 +394,27 @@ These are the most likely causes based on the symptoms described.'''
             assert ideas[0].category == "network"
             assert ideas[1].category == "physical"
 
+    def test_balanced_brace_parsing_nested_objects(self):
+        """Test balanced brace extraction keeps nested objects intact and skips stray braces"""
+        text = ('} stray close first. Idea: {"hypothesis": "Stale lease", "category": "network", '
+                '"why": "DHCP", "checks": ["ip addr"], "meta": {"source": "dhclient"}, "risk": "low"} '
+                'and broken {not json} text')
+
+        ideas = BrainstormEngine._parse_ideas_response(text, "lease issue")
+
+        assert len(ideas) == 1
+        assert ideas[0].hypothesis == "Stale lease"
+        assert ideas[0].checks == ["ip addr"]
+
+    def test_embedded_objects_with_braces_in_strings(self):
+        """Braces inside JSON strings do not split an embedded object"""
+        text = ('Try: {"hypothesis": "Bad template {{N}}", "category": "dns", "why": "a } b", '
+                '"checks": ["dig"]} then {"hypothesis": "Second", "category": "dns", "why": "x"}')
+
+        ideas = BrainstormEngine._parse_ideas_response(text, "dns")
+
+        assert [i.hypothesis for i in ideas] == ["Bad template {{N}}", "Second"]
+
     def test_template_context_building(self):
         """Test template context building with category hints and retrieval"""
         mock_system_info = {"os": "Ubuntu 22.04", "arch": "x86_64"}
@@ -360,4 +455,83 @@ These are the most likely causes based on the symptoms described.'''
             assert "network" in prompt       # CATEGORY_HINT  
             assert "3" in prompt             # N
             assert "Ubuntu 22.04" in prompt # SYSTEM (JSON stringified)
-            assert "Previous troubleshooting logs" in prompt  # RETRIEVAL
\ No newline at end of file
+            assert "Previous troubleshooting logs" in prompt  # RETRIEVAL
+
+class TestTemplateLoader:
+    """Template rendering tests"""
+
+    def test_render_blocks_and_single_pass_substitution(self):
+        from modules.brainstorm_engine import TemplateLoader
+        tpl = "I={{ISSUE}} {{#CATEGORY_HINT}}hint={{CATEGORY_HINT}}{{/CATEGORY_HINT}}{{#RETRIEVAL}}R{{/RETRIEVAL}} {{OTHER}}"
+        out = TemplateLoader.render_template(tpl, {'ISSUE': 'see {{SYSTEM}}', 'SYSTEM': '{}',
+                                                   'CATEGORY_HINT': 'dns', 'RETRIEVAL': ''})
+        assert out == "I=see {{SYSTEM}} hint=dns {{OTHER}}"
+
+    def test_load_template_reuses_recent_read(self, tmp_path, monkeypatch):
+        from modules import brainstorm_engine as be
+        monkeypatch.setenv('RN_PROMPT_DIR', str(tmp_path))
+        (tmp_path / 'brainstorm.dns.txt').write_text('v1', encoding='utf-8')
+        be._template_cache.clear()
+
+        assert be.TemplateLoader.load_template('brainstorm', category_hint='dns') == 'v1'
+        (tmp_path / 'brainstorm.dns.txt').write_text('v2', encoding='utf-8')
+        assert be.TemplateLoader.load_template('brainstorm', category_hint='dns') == 'v1'  # within TTL
+        be._template_cache.clear()
+        assert be.TemplateLoader.load_template('brainstorm', category_hint='dns') == 'v2'
+
+    def test_render_toggles_any_block_key(self):
+        from modules.brainstorm_engine import TemplateLoader
+        tpl = "{{#EXTRA}}x={{EXTRA}}{{/EXTRA}}{{#MISSING}}gone{{/MISSING}}."
+        assert TemplateLoader.render_template(tpl, {'EXTRA': '1'}) == "x=1."
+
+class TestIdea:
+    """Idea value object tests"""
+
+    def test_idea_uses_slots_and_short_ids(self):
+        a = Idea(hypothesis="h", category="dns", why="w")
+        b = Idea(hypothesis="h", category="dns", why="w")
+        assert not hasattr(a, '__dict__')
+        assert len(a.id) == 8 and a.id != b.id
+        assert a.to_dict()['checks'] == [] and a.to_dict()['evidence'] == {}
+
+    def test_idea_ids_stay_unique_past_counter_wrap(self):
+        import itertools
+        with patch('modules.brainstorm_engine._ID_COUNTER', itertools.count(0xfffe)):
+            ids = [Idea(hypothesis="h", category="dns", why="w").id for _ in range(3)]
+        assert len(set(ids)) == 3 and [len(i) for i in ids] == [8, 8, 9]
+
+    def test_from_dict_keeps_id_and_applies_defaults(self):
+        idea = Idea.from_dict({'id': 'abc123', 'hypothesis': 'h', 'checks': ['ip addr']})
+        assert idea.id == 'abc123' and idea.checks == ['ip addr']
+        assert (idea.category, idea.risk, idea.why, idea.fixes) == ('general', 'medium', '', [])
+        assert len(Idea.from_dict({}).id) == 8
+
+class TestJudgeEngine:
+    """JudgeEngine scoring tests"""
+
+    def test_score_idea_keyword_boosts(self):
+        """Ubuntu tool boosts, category match and fix cost are all applied"""
+        from modules.brainstorm_engine import JudgeEngine
+        idea = Idea(
+            hypothesis="Wireless driver stuck", category="wifi", why="x",
+            checks=["NMCLI dev status", "systemctl status NetworkManager"],
+            fixes=["sudo reboot", "Reinstall firmware package"], risk="low"
+        )
+        scores = JudgeEngine._score_idea(idea, "Wireless keeps dropping", {'distro': 'Ubuntu 24.04'})
+
+        assert scores['safety'] == 0.9
+        assert scores['success_likelihood'] == 1.0
+        assert scores['cost'] == 0.1
+        assert scores['determinism'] == pytest.approx(0.8)
+
+    def test_judge_ideas_ranks_safer_first(self):
+        """Lower risk ideas outrank high risk ones for the same issue"""
+        from modules.brainstorm_engine import JudgeEngine
+        risky = Idea(hypothesis="Flush everything", category="dns", why="y", fixes=["sudo reboot"], risk="high")
+        safe = Idea(hypothesis="Check resolver", category="dns", why="x", checks=["dig example.com"], risk="low")
+
+        with patch('modules.system_diagnostics.SystemDiagnostics.get_system_info', return_value={}):
+            ranked = JudgeEngine.judge_ideas([risky, safe], "DNS resolution failing")
+
+        assert [r['idea']['hypothesis'] for r in ranked] == ["Check resolver", "Flush everything"]
+        assert ranked[0]['scores']['success_likelihood'] == pytest.approx(0.7)
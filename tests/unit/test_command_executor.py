@@ -24,3 +24,15 @@ def test_execute_safely_respects_safe_mode(add_core_to_path):
     assert res['executed'] is False
     assert 'blocked' in res.get('output', '').lower() or res['analysis']['risk_level'] == 'high'
 
+
+
+def test_analyze_command_pattern_matching(add_core_to_path):
+    import roadnerd_server as srv
+    CE = srv.CommandExecutor
+
+    res = CE.analyze_command('RM -RF /tmp/a && rm -rf /tmp/b; mkfs.ext4 /dev/sdb1')
+    assert res['warnings'] == ['Contains dangerous pattern: rm -rf', 'Contains dangerous pattern: mkfs']
+
+    assert CE.analyze_command('rm -rformat')['warnings'] == ['Contains dangerous pattern: rm -rf',
+                                                             'Contains dangerous pattern: format']
+    assert CE.analyze_command('/usr/bin/sudo ls')['requires_sudo'] is True
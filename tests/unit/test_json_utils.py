@@ -0,0 +1,27 @@
+"""
+json_utils tests
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add poc/core to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'poc' / 'core'))
+
+from modules import json_utils
+
+
+def test_dumps_is_compact_and_keeps_unicode():
+    data = {'distro': 'Ubuntu 24.04', 'note': 'café', 1: [True, None]}
+    for backend in (json_utils.orjson, None):
+        with patch.object(json_utils, 'orjson', backend):
+            text = json_utils.dumps(data)
+            assert ', ' not in text and 'café' in text
+            assert json.loads(text) == {'distro': 'Ubuntu 24.04', 'note': 'café', '1': [True, None]}
+
+
+def test_loads_accepts_str_and_bytes():
+    assert json_utils.loads('{"a": 1}') == {'a': 1}
+    assert json_utils.loads(b'[1, 2]') == [1, 2]
@@ -0,0 +1,33 @@
+"""
+Knowledge base symptom lookup tests
+"""
+
+import sys
+from pathlib import Path
+
+# Add poc/core to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'poc' / 'core'))
+
+import roadnerd_server
+
+
+def test_kb_lookup_matches_symptom_case_insensitively():
+    solution = roadnerd_server._kb_lookup("Browser says CANNOT RESOLVE host")
+    assert solution == roadnerd_server.KNOWLEDGE_BASE['dns_issues']['solutions'][0]
+
+
+def test_kb_lookup_later_entry_wins_on_multiple_matches():
+    solution = roadnerd_server._kb_lookup("disk full and now no internet either")
+    assert solution == roadnerd_server.KNOWLEDGE_BASE['network_issues']['solutions'][0]
+
+
+def test_kb_lookup_no_match():
+    assert roadnerd_server._kb_lookup("screen turned green") is None
+
+
+def test_kb_ideas_cover_every_solution_of_the_entry():
+    ideas = roadnerd_server._kb_ideas("Disk full again")
+    solutions = roadnerd_server.KNOWLEDGE_BASE['disk_space']['solutions']
+    assert [i.hypothesis for i in ideas] == [s['name'] for s in solutions]
+    assert ideas[0].category == 'disk' and ideas[0].checks == [solutions[0]['check']]
+    assert roadnerd_server._kb_ideas("screen turned green") == []
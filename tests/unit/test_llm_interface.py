@@ -10,7 +10,7 @@ from pathlib import Path
 # Add poc/core to path to import modules  
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'poc' / 'core'))
 
-from modules.llm_interface import LLMInterface
+from modules.llm_interface import LLMInterface, _generation_cache
 import roadnerd_server
 from roadnerd_server import CONFIG
 
@@ -21,6 +21,7 @@ class TestLLMInterfaceSimple:
     def setup_method(self):
         """Reset CONFIG for each test"""
         self.original_config = CONFIG.copy()
+        _generation_cache.clear()
         CONFIG.update({
             'llm_backend': 'ollama',
             'model': 'llama3.2:3b',
@@ -59,7 +60,7 @@ class TestLLMInterfaceSimple:
         """Test graceful handling of connection errors"""
         # Test that connection errors return appropriate messages
         llm = LLMInterface(llm_backend='ollama', model='test')
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             from requests.exceptions import ConnectionError
             mock_post.side_effect = ConnectionError("Connection refused")
             
@@ -76,9 +77,9 @@ class TestLLMInterfaceSimple:
         llm = LLMInterface(llm_backend='ollama', model='gpt-oss:20b')
         with patch.dict(os.environ, {'RN_USE_CHAT_MODE': 'auto'}, clear=False):
             # Mock successful chat API call
-            with patch('requests.post') as mock_post:
+            with patch('requests.Session.post') as mock_post:
                 mock_response = MagicMock()
-                mock_response.json.return_value = {'message': {'content': 'test response'}}
+                mock_response.content = b'{"message": {"content": "test response"}}'
                 mock_post.return_value = mock_response
                 
                 result = llm.query_ollama("test")
@@ -91,9 +92,9 @@ class TestLLMInterfaceSimple:
     def test_options_override_functionality(self):
         """Test that options overrides work correctly"""
         llm = LLMInterface(llm_backend='ollama', model='test')
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = MagicMock()
-            mock_response.json.return_value = {'response': 'test'}
+            mock_response.content = b'{"response": "test"}'
             mock_post.return_value = mock_response
             
             # Test options override
@@ -107,12 +108,84 @@ class TestLLMInterfaceSimple:
             assert request_data['options']['temperature'] == 0.8
             assert request_data['options']['num_predict'] == 1024
 
+    def test_per_request_options_do_not_leak(self):
+        """Per-request overrides must not mutate the instance defaults"""
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        defaults = dict(llm.default_options)
+        with patch('requests.Session.post') as mock_post:
+            mock_response = MagicMock()
+            mock_response.content = b'{"response": "test"}'
+            mock_post.return_value = mock_response
+
+            llm.get_response("first", temperature=0.9, num_predict=700)
+            llm.get_response("second")
+
+            second_options = mock_post.call_args[1]['json']['options']
+            assert second_options == defaults
+            assert llm.default_options == defaults
+
+    def test_shared_session_and_timeout(self):
+        """All instances share one HTTP session and always pass a timeout"""
+        from modules.llm_interface import get_http_session
+        assert get_http_session() is get_http_session()
+
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.content = b'{"response": "ok"}'
+            assert llm.query_ollama("test") == 'ok'
+            assert mock_post.call_args[1]['timeout'] == llm.timeout
+
+    def test_keep_alive_sent_and_warm_up(self):
+        """Ollama payloads carry keep_alive; warm_up loads the model without a prompt"""
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.content = b'{"response": "ok"}'
+            mock_post.return_value.status_code = 200
+            llm.query_ollama("test")
+            assert mock_post.call_args[1]['json']['keep_alive'] == llm.keep_alive
+
+            assert llm.warm_up() is True
+            assert '/api/generate' in mock_post.call_args[0][0]
+            assert 'prompt' not in mock_post.call_args[1]['json']
+
+        assert LLMInterface(llm_backend='llamafile', model='').warm_up() is False
+
+    def test_stream_hangs_up_when_stop_matches(self):
+        """A stop predicate streams the generation and closes it early"""
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        lines = [b'{"response": "[1,"}', b'{"response": " 2]"}', b'{"response": " and more"}', b'{"done": true}']
+        with patch('requests.Session.post') as mock_post:
+            response = mock_post.return_value.__enter__.return_value
+            response.iter_lines.return_value = iter(lines)
+            text = llm.get_response("test", num_predict=64, stop=lambda t: t.endswith(']'))
+
+        assert text == '[1, 2]'
+        assert mock_post.call_args[1]['stream'] is True
+        assert mock_post.call_args[1]['json']['stream'] is True
+        assert mock_post.call_args[1]['json']['options']['num_predict'] == 64
+
+    def test_stream_response_yields_pieces(self):
+        """stream_response yields Ollama pieces as they arrive; errors come back as text"""
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        lines = [b'{"response": "Hel"}', b'', b'{"response": "lo"}', b'{"done": true}']
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.__enter__.return_value.iter_lines.return_value = iter(lines)
+            assert list(llm.stream_response("test")) == ['Hel', 'lo']
+
+            mock_post.return_value.__enter__.return_value.iter_lines.return_value = iter([b'{"error": "model not found"}'])
+            assert list(llm.stream_response("test")) == ['Ollama not available: model not found']
+
+        llm = LLMInterface(llm_backend='llamafile', model='')
+        with patch.object(llm, 'get_response', return_value='whole') as whole:
+            assert list(llm.stream_response("test", num_predict=8)) == ['whole']
+            assert whole.call_args[1]['num_predict'] == 8
+
     def test_llamafile_backend(self):
         """Test llamafile backend functionality"""
         llm = LLMInterface(llm_backend='llamafile', model='test')
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = MagicMock()
-            mock_response.json.return_value = {'content': 'llamafile response'}
+            mock_response.content = b'{"content": "llamafile response"}'
             mock_post.return_value = mock_response
             
             result = llm.query_llamafile("test prompt")
@@ -122,4 +195,23 @@ class TestLLMInterfaceSimple:
             
             # Verify correct endpoint was called
             call_args = mock_post.call_args
-            assert '/completion' in call_args[0][0]
\ No newline at end of file
+            assert '/completion' in call_args[0][0]
+    def test_temperature_zero_generations_are_replayed(self):
+        """get_response caches deterministic Ollama replies per model/prompt/num_predict/top_p"""
+        llm = LLMInterface(llm_backend='ollama', model='test')
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.content = b'{"response": "ok"}'
+            assert llm.get_response("dns?", temperature=0.0) == 'ok'
+            assert LLMInterface(llm_backend='ollama', model='test').get_response("dns?") == 'ok'
+            assert mock_post.call_count == 1
+
+            llm.get_response("dns?", num_predict=64)
+            llm.get_response("dns?", top_p=0.5)
+            llm.get_response("dns?", temperature=0.7)
+            llm.get_response("dns?", temperature=0.7)
+            assert mock_post.call_count == 5
+
+            mock_post.side_effect = ConnectionError('refused')
+            assert llm.get_response("down?").startswith('Ollama not available')
+            llm.get_response("down?")
+            assert mock_post.call_count == 7  # failures are not cached
@@ -0,0 +1,68 @@
+"""
+TTLCache / SemanticCache tests
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add poc/core to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'poc' / 'core'))
+
+from modules.response_cache import SemanticCache, TTLCache
+
+
+def test_get_set_and_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' becomes most recent
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1}
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(maxsize=4, ttl=10)
+    with patch('modules.response_cache.time.monotonic', return_value=100.0):
+        cache.set('k', 'v')
+    with patch('modules.response_cache.time.monotonic', return_value=105.0):
+        assert cache.get('k') == 'v'
+    with patch('modules.response_cache.time.monotonic', return_value=111.0):
+        assert cache.get('k') is None
+    assert len(cache) == 0
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(maxsize=4, ttl=0)
+    cache.set('k', 'v')
+    assert cache.get('k') is None
+
+
+def test_make_key_is_stable_and_order_sensitive():
+    assert TTLCache.make_key('llm', 'm', 'p') == TTLCache.make_key('llm', 'm', 'p')
+    assert TTLCache.make_key('a', 'b') != TTLCache.make_key('b', 'a')
+
+
+def _bag_of_words(text):
+    vocab = ['wifi', 'drops', 'keeps', 'dns', 'disk', 'full']
+    words = text.lower().split()
+    return [float(words.count(w)) for w in vocab]
+
+
+def test_semantic_cache_matches_close_issue_within_scope():
+    cache = SemanticCache(threshold=0.8, encoder=_bag_of_words)
+    cache.set('scope-a', 'wifi keeps drops', {'ideas': [1]})
+    value, issue, similarity = cache.get('scope-a', 'wifi drops')
+    assert value == {'ideas': [1]} and issue == 'wifi keeps drops'
+    assert similarity >= 0.8
+    assert cache.get('scope-b', 'wifi drops') is None
+    assert cache.get('scope-a', 'disk full') is None
+
+
+def test_semantic_cache_disabled_without_encoder():
+    cache = SemanticCache(encoder=None)
+    cache._encoder_loaded = True  # as if sentence-transformers failed to import
+    cache.set('s', 'wifi drops', 'v')
+    assert cache.get('s', 'wifi drops') is None
@@ -1,3 +1,4 @@
+import socket
 from types import SimpleNamespace
 
 
@@ -14,10 +15,14 @@ def test_ipv4_addresses_parsing(monkeypatch, add_core_to_path):
         return SimpleNamespace(stdout=sample, returncode=0)
 
     monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    # Exercise the `ip addr` parser used when /proc/net/fib_trie is unavailable
+    monkeypatch.setattr(srv.SystemDiagnostics, '_proc_ipv4_addresses', staticmethod(lambda: None))
+    srv.SystemDiagnostics.ipv4_addresses.cache_clear()
     ips = srv.SystemDiagnostics.ipv4_addresses()
     assert '10.55.0.1' in ips
     assert '172.20.4.96' in ips
     assert '127.0.0.1' not in ips
+    srv.SystemDiagnostics.ipv4_addresses.cache_clear()
 
 
 def test_check_connectivity_resilient(monkeypatch, add_core_to_path):
@@ -30,15 +35,118 @@ def test_check_connectivity_resilient(monkeypatch, add_core_to_path):
     def fail_dns(host):
         raise Boom('dns fail')
 
-    monkeypatch.setattr(srv.socket, 'gethostbyname', fail_dns)
+    monkeypatch.setattr(socket, 'gethostbyname', fail_dns)
 
     # Simulate gateway check failing
     def fake_run(cmd, capture_output=False, text=False):
         return SimpleNamespace(stdout='default via 10.55.0.1 dev enp58s0\n', returncode=0)
 
     monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
     chk = srv.SystemDiagnostics.check_connectivity()
     assert chk.get('dns') in ('failed', 'working')  # resilient path
     assert 'gateway' in chk
     assert 'interfaces' in chk
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
 
+
+
+def test_connectivity_for_skips_unrelated_issues(monkeypatch, add_core_to_path):
+    import roadnerd_server as srv
+
+    calls = []
+    monkeypatch.setattr(srv.SystemDiagnostics, 'check_connectivity', staticmethod(lambda: calls.append(1) or {'dns': 'working'}))
+
+    assert srv.SystemDiagnostics.connectivity_for('Disk is full')['dns'] == 'not_checked'
+    assert calls == []
+    assert srv.SystemDiagnostics.connectivity_for('WiFi keeps dropping') == {'dns': 'working'}
+    assert calls == [1]
+
+
+def test_system_checks_are_reused_briefly(monkeypatch, add_core_to_path):
+    import roadnerd_server as srv
+
+    calls = []
+
+    def fake_run(cmd, capture_output=False, text=False):
+        calls.append(cmd)
+        return SimpleNamespace(stdout='2: eth0    inet 10.0.0.2/24 scope global eth0\n', returncode=0)
+
+    monkeypatch.setattr(srv.subprocess, 'run', fake_run)
+    # Exercise the `ip addr` parser used when /proc/net/fib_trie is unavailable
+    monkeypatch.setattr(srv.SystemDiagnostics, '_proc_ipv4_addresses', staticmethod(lambda: None))
+    srv.SystemDiagnostics.ipv4_addresses.cache_clear()
+    first = srv.SystemDiagnostics.ipv4_addresses()
+    first.append('mutated by caller')
+    assert srv.SystemDiagnostics.ipv4_addresses() == ['10.0.0.2']
+    assert len(calls) == 1
+    srv.SystemDiagnostics.ipv4_addresses.cache_clear()
+
+
+def test_dns_check_is_bounded(monkeypatch, add_core_to_path):
+    import threading
+    import roadnerd_server as srv
+
+    release = threading.Event()
+    monkeypatch.setattr(socket, 'gethostbyname', lambda host: release.wait(5))
+    monkeypatch.setenv('RN_DNS_TIMEOUT', '0.05')
+    try:
+        assert srv.SystemDiagnostics._dns_status('google.com') == 'timeout'
+    finally:
+        release.set()
+
+
+def test_connectivity_reads_kernel_state_without_ip(monkeypatch, add_core_to_path):
+    import roadnerd_server as srv
+
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError('ip should not be forked on Linux')
+
+    monkeypatch.setattr(srv.subprocess, 'run', no_subprocess)
+    monkeypatch.setattr(srv.SystemDiagnostics, '_proc_has_default_route', staticmethod(lambda: False))
+    monkeypatch.setattr(srv.SystemDiagnostics, '_sysfs_interfaces_up', staticmethod(lambda: 2))
+    monkeypatch.setattr(srv.SystemDiagnostics, '_dns_status', staticmethod(lambda host: 'working'))
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
+    assert srv.SystemDiagnostics.check_connectivity() == {'dns': 'working', 'gateway': 'missing', 'interfaces': 2}
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
+
+
+def test_connectivity_probes_run_concurrently(monkeypatch, add_core_to_path):
+    import threading
+    import roadnerd_server as srv
+
+    gateway_started = threading.Event()
+
+    def gateway():
+        gateway_started.set()
+        return 'configured'
+
+    # DNS only resolves if the gateway probe is running alongside it
+    monkeypatch.setattr(srv.SystemDiagnostics, '_dns_status',
+                        staticmethod(lambda host: 'working' if gateway_started.wait(2) else 'timeout'))
+    monkeypatch.setattr(srv.SystemDiagnostics, '_gateway_status', staticmethod(gateway))
+    monkeypatch.setattr(srv.SystemDiagnostics, '_interfaces_up', staticmethod(lambda: 1))
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
+    assert srv.SystemDiagnostics.check_connectivity() == {'dns': 'working', 'gateway': 'configured', 'interfaces': 1}
+    srv.SystemDiagnostics.check_connectivity.cache_clear()
+
+
+def test_ipv4_addresses_include_secondary_addresses(monkeypatch, tmp_path, add_core_to_path):
+    import builtins
+    import roadnerd_server as srv
+
+    fib = (
+        "Main:\n  +-- 0.0.0.0/0 3 0 5\n"
+        "     +-- 10.55.0.0/24 2 0 2\n"
+        "        |-- 10.55.0.1\n           /32 host LOCAL\n"
+        "        |-- 10.55.0.9\n           /32 host LOCAL\n"
+        "        |-- 10.55.0.255\n           /32 link BROADCAST\n"
+        "     |-- 127.0.0.1\n        /32 host LOCAL\n"
+        "Local:\n"
+        "        |-- 10.55.0.1\n           /32 host LOCAL\n"
+    )
+    (tmp_path / 'fib_trie').write_text(fib)
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, 'open', lambda path, *a, **kw: real_open(
+        tmp_path / 'fib_trie' if path == '/proc/net/fib_trie' else path, *a, **kw))
+    assert srv.SystemDiagnostics._proc_ipv4_addresses() == ['10.55.0.1', '10.55.0.9']
@@ -57,7 +57,8 @@ def main():
         issue = case['issue']
         cid = case.get('id')
         print(f"\n== Case {cid} ==")
-        r = requests.post(f"{args.base_url}/api/diagnose", json={'issue': issue})
+        # kb_direct=False: always evaluate the model, even when the KB knows the issue
+        r = requests.post(f"{args.base_url}/api/diagnose", json={'issue': issue, 'kb_direct': False})
         data = r.json()
         suggestion = data.get('llm_suggestion') or ''
 